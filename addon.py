@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import time
+# Beginn des Aufrufs (für die Zeitmessung, siehe timing.py)
+STARTED = time.perf_counter()
 import sys
 import xbmcgui
 import xbmcplugin
@@ -8,7 +11,31 @@ import xbmcvfs
 import traceback
 import json
 import os
-from urllib.parse import urlencode, parse_qsl
+import hashlib
+import uuid
+import re
+from urllib.parse import urlencode
+from resources.lib.metadata import VideoInfo, STATUS_OK, STATUS_FALLBACK, STATUS_UNPLAYABLE, fallback_info, thumb_url, poster_url
+from resources.lib import runtime
+from resources.lib import catalog
+from resources.lib import manifest
+from resources.lib import snapshots
+from resources.lib import shuffle
+from resources.lib import playqueue
+from resources.lib import history
+from resources.lib.mix import parse_weights
+from resources.lib import durations
+from resources.lib import songs
+from resources.lib import availability
+from resources.lib import recheck
+from resources.lib import library
+from resources.lib import epg
+from resources.lib import timing
+from resources.lib.fetcher import (MetadataFetcher, PRIORITY_VISIBLE, PRIORITY_NEAR,
+                                   PRIORITY_CHANNEL, PRIORITY_OTHER)
+from resources.lib.progress import FetchProgress
+from resources.lib.metadata_index import MetadataIndex
+from resources.lib.metadata_store import ENTRY_SIZE_ESTIMATE
 
 ADDON = xbmcaddon.Addon()
 ADDON_NAME = ADDON.getAddonInfo('name')
@@ -16,15 +43,101 @@ ADDON_PATH = xbmcvfs.translatePath(ADDON.getAddonInfo('path'))
 ADDON_DATA_PATH = xbmcvfs.translatePath(ADDON.getAddonInfo('profile'))
 
 # Cache-Dateien
+CACHE_FOLDER = os.path.join(ADDON_DATA_PATH, 'metadata')
 USER_CACHE_FILE = os.path.join(ADDON_DATA_PATH, 'video_metadata_cache.json')
 PREBUILT_CACHE_FILE = os.path.join(ADDON_PATH, 'resources', 'cache', 'video_metadata_cache.json')
+PREBUILT_INDEX_FILE = os.path.join(ADDON_PATH, 'resources', 'cache', 'video_metadata_index.bin')
+PREBUILT_MANIFEST_FILE = os.path.join(ADDON_PATH, 'resources', 'cache', 'catalog_manifest.json')
+MANIFEST_FILE = os.path.join(ADDON_DATA_PATH, 'catalog_manifest.json')
+SNAPSHOT_FOLDER = os.path.join(ADDON_DATA_PATH, 'snapshots')
+AVAILABILITY_FOLDER = os.path.join(ADDON_DATA_PATH, 'availability')
+SHUFFLE_STATE_FILE = os.path.join(ADDON_DATA_PATH, 'shuffle.json')
+PLAY_SESSION_FILE = os.path.join(ADDON_DATA_PATH, 'play_session.json')
+PLAY_HISTORY_FILE = os.path.join(ADDON_DATA_PATH, 'history.bin')
+PLAYED_FILE = os.path.join(ADDON_DATA_PATH, 'played.bin')
+SESSION_HISTORY_FILE = os.path.join(ADDON_DATA_PATH, 'history_session.bin')
+DURATIONS_FILE = os.path.join(ADDON_DATA_PATH, 'durations.bin')
+SONGS_FILE = os.path.join(ADDON_DATA_PATH, 'songs.bin')
+CHECKS_FILE = os.path.join(ADDON_DATA_PATH, 'checked.bin')
+FAILURES_FILE = os.path.join(ADDON_DATA_PATH, 'failures.bin')
+PLAYBACK_FAILURES_FILE = os.path.join(ADDON_DATA_PATH, 'playback_failures.bin')
+RECHECK_BUDGET_FILE = os.path.join(ADDON_DATA_PATH, 'recheck.json')
+LIBRARY_STATE_FILE = os.path.join(ADDON_DATA_PATH, 'library.json')
+GUIDE_STATE_FILE = os.path.join(ADDON_DATA_PATH, 'guide.json')
+LIVE_TV_M3U_NAME = 'mtvrewind.m3u'
+LIVE_TV_GUIDE_NAME = 'mtvrewind.xml'
+TIMING_FILE = os.path.join(ADDON_DATA_PATH, 'timing.jsonl')
 
+# Anzeigenamen der Kanäle
+CHANNEL_NAMES = {
+    '1stday': '1st Day (1981)',
+    '70s': '1970s',
+    '80s': '1980s', 
+    '90s': '1990s',
+    '2000s': '2000s',
+    '2010s': '2010s',
+    '2020s': '2020s',
+    'trl': 'TRL (Total Request Live)',
+    'raps': 'Yo! MTV Raps',
+    'metal': 'Headbangers Ball',
+    '120minutes': '120 Minutes (Alternative)',
+    'unplugged': 'MTV Unplugged',
+    'club': 'Club MTV / Dance',
+    'commercials': 'MTV Commercials',
+}
+
+# Parallele Anfragen beim Laden von Metadaten
+FETCH_WORKERS = 4
+
+# Ab so vielen fehlenden Videos wird ein Fortschrittsdialog angezeigt
+PROGRESS_MIN_ITEMS = 20
+
+# Speicherspar-Modus: so viele Einträge werden auf einmal an Kodi übergeben
+ITEMS_PER_BATCH = 100
+
+# Parallele Anfragen beim Laden von Videolängen (Batches, siehe durations.py)
+DURATION_WORKERS = 2
+
+# Zufallsziehungen pro Video, die wegen des No-Repeat-Fensters verworfen werden dürfen
+MIX_MAX_REJECTS = 50
+
+# Abstand der Verfuegbarkeits-Pruefungen im Dienst (Sekunden)
+RECHECK_INTERVAL = 900
+
+# Anfragen pro Sekunde bei der Verfuegbarkeits-Pruefung
+RECHECK_RATE = 1
+
+# Tatsächlich gespielte Videos, die für die Verfügbarkeits-Prüfung gemerkt werden
+PLAYED_HISTORY_SIZE = 1000
+
+# Endet ein Video nach weniger Sekunden, gilt die Wiedergabe als fehlgeschlagen
+PLAYBACK_FAILURE_SECONDS = 5
+
+_VIDEO_ID_PARAM = re.compile(r'[?&]video_id=([A-Za-z0-9_-]{11})')
+
+# Offene Metadaten-Anfragen, nach Sichtbarkeit priorisiert (überlebt mehrere Aufrufe)
+FETCH_QUEUE = runtime.get_fetch_queue()
+
+# Window-Property mit dem Token des neuesten Aufrufs. Ein laufender Aufruf
+# bricht seine Arbeit ab, sobald ein neuerer Aufruf das Token überschreibt.
+REQUEST_TOKEN_PROPERTY = 'mtvrewind.request_token'
+# Lange Aufträge mit eigenem Token (siehe make_cancel_check)
+JOB_LIBRARY = 'library'
+JOB_DURATIONS = 'durations'
+
+# Daten des aktuellen Aufrufs (wird in router gesetzt)
+REQUEST = None
+
+# Zeitmessung des laufenden Aufrufs (wird in router je nach Setting eingeschaltet)
+TIMER = timing.PhaseTimer(False)
 
-# Memory Cache
-VIDEO_INFO_CACHE = {}
 
 def get_url(**kwargs):
-    return '{}?{}'.format(sys.argv[0], urlencode(kwargs))
+    return '{}?{}'.format(REQUEST.base_url, urlencode(kwargs))
+
+def get_plugin_url(**kwargs):
+    """Wie get_url, aber ohne laufende Anfrage (z.B. im Dienst)."""
+    return 'plugin://{}/?{}'.format(ADDON.getAddonInfo('id'), urlencode(kwargs))
 
 def log(msg):
     xbmc.log('[MTV-REWIND] {}'.format(str(msg)), xbmc.LOGINFO)
@@ -33,36 +146,69 @@ def get_setting_bool(setting_id):
     """Liest Boolean-Setting aus."""
     return ADDON.getSettingBool(setting_id)
 
+def get_setting_int(setting_id):
+    """Liest Integer-Setting aus."""
+    return ADDON.getSettingInt(setting_id)
+
+# InfoTagVideo-Setter gibt es erst ab Kodi 20
+USE_INFO_TAG = hasattr(getattr(xbmc, 'InfoTagVideo', None), 'setTitle')
+
+# Speicherspar-Modus: Budget in MB (0 = aus)
+MEMORY_BUDGET_MB = get_setting_int('memory_budget')
+
+# Memory Cache (Shards werden bei Bedarf geladen, alte Einzeldateien einmalig migriert).
+# Liegt in resources.lib.runtime und ueberlebt so mehrere Aufrufe (reuselanguageinvoker).
+# Im Speicherspar-Modus bekommt ein LRU die Hälfte des Budgets; der Rest bleibt
+# für die IDs des Kanals, gerade gelesene Shards und die Zeilen eines Blocks.
+VIDEO_INFO_CACHE = runtime.get_metadata_cache(
+    CACHE_FOLDER, (USER_CACHE_FILE, PREBUILT_CACHE_FILE), log,
+    MEMORY_BUDGET_MB * 1024 * 1024 // 2 // ENTRY_SIZE_ESTIMATE)
+
 def ensure_addon_data_folder():
     """Stellt sicher dass der addon_data Ordner existiert."""
     if not xbmcvfs.exists(ADDON_DATA_PATH):
         xbmcvfs.mkdirs(ADDON_DATA_PATH)
         log('Created addon_data folder: {}'.format(ADDON_DATA_PATH))
 
-def load_cache_from_disk():
-    """Lädt den Metadaten-Cache von der Festplatte."""
-    global VIDEO_INFO_CACHE
+def open_cache():
+    """Bereitet den Metadaten-Cache vor, ohne Shards zu laden."""
+    ensure_addon_data_folder()
+    VIDEO_INFO_CACHE.migrate_legacy()
     
+    # Shards aus einem früheren Aufruf verwerfen, falls sie inzwischen neu geschrieben wurden
+    dropped = VIDEO_INFO_CACHE.refresh()
+    if dropped:
+        log('Dropped {} cache shards changed on disk'.format(dropped))
+    
+    # Vorgefertigter Index wird nur gemappt, nicht geparst
+    if VIDEO_INFO_CACHE.fallback is None and xbmcvfs.exists(PREBUILT_INDEX_FILE):
+        VIDEO_INFO_CACHE.fallback = MetadataIndex(PREBUILT_INDEX_FILE)
+        log('Mapped prebuilt metadata index with {} entries'.format(len(VIDEO_INFO_CACHE.fallback)))
+
+def load_cache_from_disk(video_ids=None):
+    """Lädt die Cache-Shards für die angegebenen Videos (None = alle) von der Festplatte."""
     try:
-        if xbmcvfs.exists(PREBUILT_CACHE_FILE):
-            with open(PREBUILT_CACHE_FILE, 'r', encoding='utf-8') as f:
-                VIDEO_INFO_CACHE = json.load(f)
-                log('Loaded {} cached video metadata entries from disk'.format(len(VIDEO_INFO_CACHE)))
-                return True
+        open_cache()
+        
+        shard_count = VIDEO_INFO_CACHE.preload(video_ids)
+        log('Loaded {} cached video metadata entries from {} shards'.format(
+            len(VIDEO_INFO_CACHE), shard_count))
+        return True
     except Exception as e:
         log('Error loading cache: {}'.format(str(e)))
     
     return False
 
 def save_cache_to_disk():
-    """Speichert den Metadaten-Cache auf die Festplatte."""
+    """Speichert die geänderten Shards des Metadaten-Caches auf die Festplatte."""
     try:
         ensure_addon_data_folder()
         
-        with open(PREBUILT_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(VIDEO_INFO_CACHE, f, ensure_ascii=False, indent=2)
+        with TIMER.span('cache_save'):
+            written = VIDEO_INFO_CACHE.save()
         
-        log('Saved {} video metadata entries to cache'.format(len(VIDEO_INFO_CACHE)))
+        log('Saved {} cache shards ({} video metadata entries loaded)'.format(
+            written, len(VIDEO_INFO_CACHE)))
         return True
     except Exception as e:
         log('Error saving cache: {}'.format(str(e)))
@@ -72,21 +218,119 @@ def get_playlists():
     """Gibt die eingebetteten Playlist-Daten zurueck."""
     try:
         from resources.lib.playlists_data import PLAYLISTS
-        log('Loaded {} channels with {} total videos'.format(
-            len(PLAYLISTS), sum(len(v) for v in PLAYLISTS.values())))
+        log('Loaded {} channels'.format(len(PLAYLISTS)))
         return PLAYLISTS
     except Exception as e:
         log('ERROR loading playlists: {}'.format(str(e)))
         return {}
 
-def get_video_info_from_youtube(video_id, force_refresh=False):
-    """Holt Video-Metadaten von YouTube via oEmbed API mit Caching."""
-    # Prüfe Memory-Cache
-    if not force_refresh and video_id in VIDEO_INFO_CACHE:
-        return VIDEO_INFO_CACHE[video_id]
-    
+def load_manifest():
+    """Lädt das Katalog-Manifest (vorgefertigt oder aus addon_data) oder erzeugt es neu."""
+    key = manifest.source_key()
+    for path in (PREBUILT_MANIFEST_FILE, MANIFEST_FILE):
+        try:
+            loaded = manifest.load_manifest(path, key)
+        except Exception as e:
+            log('Error loading manifest {}: {}'.format(path, str(e)))
+            loaded = None
+        if loaded is not None:
+            break
+    else:
+        # Playlist-Datei wird kanalweise gelesen, PLAYLISTS muss nicht importiert werden
+        loaded = manifest.CatalogManifest.build(catalog.iter_channels(), key)
+        try:
+            manifest.save_manifest(MANIFEST_FILE, loaded)
+        except Exception as e:
+            log('Error saving manifest: {}'.format(str(e)))
+    log('Catalog: {} videos in {} channels, {} unique'.format(
+        loaded.total, len(loaded.channel_ids), loaded.unique))
+    return loaded
+
+def get_manifest():
+    """Katalog-Manifest; wird nur einmal pro Prozess geladen."""
+    return runtime.get_manifest(load_manifest)
+
+def get_channel_counts():
+    """Gibt {channel_id: anzahl videos} zurueck."""
+    return dict(get_manifest().counts)
+
+def get_channel_ids(channel_id):
+    """Gibt die Video-IDs eines Kanals zurueck (None wenn unbekannt)."""
+    if MEMORY_BUDGET_MB:
+        # Nur den angeforderten Kanal in den Speicher holen
+        video_ids = catalog.read_channel(channel_id)
+        log('Read channel {} from playlist file (memory budget {} MB)'.format(channel_id, MEMORY_BUDGET_MB))
+        return video_ids
+    return get_playlists().get(channel_id)
+
+def get_unique_ids():
+    """Alle Video-IDs des Katalogs, jede nur einmal (bei ihrem ersten Kanal)."""
+    catalog_manifest = get_manifest()
+    video_ids = []
+    for channel_id, channel_video_ids in catalog.iter_channels():
+        video_ids.extend(video_id for video_id in channel_video_ids
+                         if catalog_manifest.is_primary(video_id, channel_id))
+    return list(dict.fromkeys(video_ids))
+
+def load_dead_bitmap(channel_id, size):
+    """Bitmap der nicht abspielbaren Videos eines Kanals (None wenn unbekannt)."""
+    try:
+        return availability.load_bitmap(AVAILABILITY_FOLDER, channel_id, size)
+    except Exception as e:
+        log('Error loading availability for {}: {}'.format(channel_id, str(e)))
+        return None
+
+def save_dead_bitmap(channel_id, bitmap):
+    try:
+        availability.save_bitmap(AVAILABILITY_FOLDER, channel_id, bitmap)
+    except Exception as e:
+        log('Error saving availability for {}: {}'.format(channel_id, str(e)))
+
+def get_playable_ids(channel_id, keep_positions=False):
+    """Video-IDs eines Kanals ohne gelöschte/private Videos.
+
+    Mit keep_positions werden tote Videos durch None ersetzt, damit Indizes
+    (und damit Zufalls-Sessions) stabil bleiben.
+    """
+    video_ids = get_channel_ids(channel_id)
+    if not video_ids:
+        return video_ids
+    dead = load_dead_bitmap(channel_id, len(video_ids))
+    if dead is None:
+        return video_ids
+    return dead.mask(video_ids) if keep_positions else dead.filter(video_ids)
+
+def get_snapshot_key(video_ids, fetch_metadata):
+    """Schlüssel des Listen-Snapshots aus den IDs des Kanals und der Darstellungsart."""
+    if not fetch_metadata:
+        return snapshots.snapshot_key(video_ids, 'plain')
+    fallback = VIDEO_INFO_CACHE.fallback
+    return snapshots.snapshot_key(video_ids, 'metadata:{}'.format(len(fallback) if fallback is not None else 0))
+
+def load_channel_snapshot(channel_id, video_ids, fetch_metadata):
+    """Lädt die gespeicherten Zeilen eines Kanals (None wenn veraltet oder nicht vorhanden).
+
+    Mit Metadaten verfällt der Snapshot, sobald der Cache eines seiner Videos geändert hat.
+    """
+    try:
+        return snapshots.load_snapshot(SNAPSHOT_FOLDER, channel_id, get_snapshot_key(video_ids, fetch_metadata),
+                                       video_ids, VIDEO_INFO_CACHE.changed_since if fetch_metadata else None)
+    except Exception as e:
+        log('Error loading snapshot for {}: {}'.format(channel_id, str(e)))
+        return None
+
+def save_channel_snapshot(channel_id, video_ids, fetch_metadata, rows, since):
+    try:
+        snapshots.save_snapshot(SNAPSHOT_FOLDER, channel_id, get_snapshot_key(video_ids, fetch_metadata),
+                                rows, since)
+    except Exception as e:
+        log('Error saving snapshot for {}: {}'.format(channel_id, str(e)))
+
+def fetch_video_info(video_id):
+    """Holt Video-Metadaten von YouTube via oEmbed API (ohne Cache, thread-sicher)."""
     try:
         import urllib.request
+        import urllib.error
         
         log('Fetching metadata for video: {}'.format(video_id))
         url = 'https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={}&format=json'.format(video_id)
@@ -118,105 +362,783 @@ def get_video_info_from_youtube(video_id, force_refresh=False):
                 song = song.replace(phrase, '')
             song = song.strip()
             
-            info = {
-                'artist': artist,
-                'title': song,
-                'full_title': title,
-                'thumb': 'https://i.ytimg.com/vi/{}/mqdefault.jpg'.format(video_id),
-                'poster': 'https://i.ytimg.com/vi/{}/hqdefault.jpg'.format(video_id),
-                'plot': '{} - {}'.format(artist, song)
-            }
-            
-            # Speichere im Memory-Cache
-            VIDEO_INFO_CACHE[video_id] = info
-            return info
+            return VideoInfo(video_id, artist, song, title)
             
+    except urllib.error.HTTPError as e:
+        # 404 = gelöscht, 401/403 = privat/gesperrt, sonst vorübergehend
+        log('Could not fetch info for {}: HTTP {}'.format(video_id, e.code))
+        return fallback_info(video_id, availability.classify_http_status(e.code))
     except Exception as e:
         log('Could not fetch info for {}: {}'.format(video_id, str(e)))
     
     # Fallback
-    fallback = {
-        'artist': 'Unknown Artist',
-        'title': 'Video {}'.format(video_id[:8]),
-        'full_title': video_id,
-        'thumb': 'https://i.ytimg.com/vi/{}/mqdefault.jpg'.format(video_id),
-        'poster': 'https://i.ytimg.com/vi/{}/hqdefault.jpg'.format(video_id),
-        'plot': 'YouTube Video ID: {}'.format(video_id)
-    }
+    return fallback_info(video_id)
+
+def get_video_info_from_youtube(video_id, force_refresh=False):
+    """Holt Video-Metadaten von YouTube via oEmbed API mit Caching."""
+    # Prüfe Memory-Cache
+    if not force_refresh and video_id in VIDEO_INFO_CACHE:
+        return VIDEO_INFO_CACHE[video_id]
+    
+    # Speichere im Memory-Cache
+    info = fetch_video_info(video_id)
+    VIDEO_INFO_CACHE[video_id] = info
+    return info
+
+def token_property(job=None):
+    """Fenster-Property mit dem Token der Navigation bzw. eines Auftrags (job)."""
+    return REQUEST_TOKEN_PROPERTY if job is None else '{}.{}'.format(REQUEST_TOKEN_PROPERTY, job)
+
+def claim_request_token(job=None):
+    """Markiert diesen Aufruf als den neuesten (bzw. als neuesten Auftrag der
+    Art job) und gibt sein Token zurück."""
+    token = uuid.uuid4().hex
+    xbmcgui.Window(10000).setProperty(token_property(job), token)
+    return token
+
+def make_cancel_check(token, job=None):
+    """Abbruch-Prüfung: Kodi beendet sich bzw. stoppt das Skript (z.B. Zurück
+    während des Ladens), oder ein neuerer Aufruf hat das Token übernommen.
+
+    Mit job zählt nur ein neuerer Auftrag derselben Art; Navigation bricht
+    z.B. den Bibliotheks-Export nicht ab."""
+    monitor = xbmc.Monitor()
+    home_window = xbmcgui.Window(10000)
+    key = token_property(job)
+    
+    def is_cancelled():
+        return (monitor.abortRequested()
+                or home_window.getProperty(key) != token)
+    return is_cancelled
+
+def queue_channel_fetches(video_ids, missing_ids, page_ids, near_ids):
+    """Reiht fehlende Metadaten nach Sichtbarkeit ein.
+
+    Offene Anfragen früherer Aufrufe rutschen hinter den aktuellen Kanal.
+    """
+    missing = set(missing_ids)
+    FETCH_QUEUE.demote_all(PRIORITY_OTHER)
+    FETCH_QUEUE.push([video_id for video_id in page_ids if video_id in missing], PRIORITY_VISIBLE)
+    FETCH_QUEUE.push([video_id for video_id in near_ids if video_id in missing], PRIORITY_NEAR)
+    FETCH_QUEUE.push(missing_ids, PRIORITY_CHANNEL)
+
+def fetch_missing_metadata(is_cancelled, max_priority=None, save_every=0):
+    """Lädt eingereihte Metadaten bis max_priority (None = alle) parallel und
+    speichert das Ergebnis (auch bei Abbruch).
+
+    Bei vielen Videos läuft ein Hintergrund-Dialog mit Rate und Restzeit mit.
+    Abgebrochen wird über Zurück-Navigation bzw. Kodi-Abbruch (siehe make_cancel_check).
+    Gibt (anzahl_geladen, abgebrochen) zurück.
+    """
+    total = FETCH_QUEUE.count(max_priority)
+    fetched = [0]
+    song_ids = {}
+    checked = {}
+    failed = {}
+    progress = None
+    if total >= PROGRESS_MIN_ITEMS:
+        progress = FetchProgress(xbmcgui.DialogProgressBG(), '{} - Metadaten'.format(ADDON_NAME), total)
+    
+    def on_result(video_id, info):
+        info = VIDEO_INFO_CACHE[video_id] = info or fallback_info(video_id)
+        song_ids[video_id] = songs.info_song_id(info)
+        (failed if info.status == STATUS_FALLBACK else checked)[video_id] = int(time.time())
+        fetched[0] += 1
+        if progress is not None:
+            progress.update(fetched[0])
+        # Progress-Log alle 50 Videos
+        if fetched[0] % 50 == 0:
+            log('Fetched {} of {} missing videos'.format(fetched[0], total))
+        if save_every and fetched[0] % save_every == 0:
+            save_cache_to_disk()
+    
+    fetcher = MetadataFetcher(fetch_video_info, FETCH_WORKERS, is_cancelled)
+    try:
+        fetcher.run(FETCH_QUEUE, on_result, max_priority)
+    finally:
+        if progress is not None:
+            progress.close()
+    
+    if fetcher.cancelled:
+        log('Metadata fetch cancelled after {} of {} videos'.format(fetched[0], total))
     
-    VIDEO_INFO_CACHE[video_id] = fallback
-    return fallback
+    # Bereits geladene Daten nicht verlieren
+    if fetched[0] > 0:
+        log('Saving cache with {} new entries...'.format(fetched[0]))
+        save_cache_to_disk()
+        try:
+            get_song_store().add(song_ids)
+        except Exception as e:
+            log('Error saving song ids: {}'.format(str(e)))
+        record_checks(checked, failed)
+    
+    return fetched[0], fetcher.cancelled
+
+def get_check_store():
+    """Zeitpunkt der letzten erfolgreichen Abfrage pro Video."""
+    return runtime.get_record_store(recheck.TimestampStore, CHECKS_FILE)
+
+def get_failure_store():
+    """Zeitpunkt des letzten Fehlers pro Video (Laden oder Wiedergabe)."""
+    return runtime.get_record_store(recheck.TimestampStore, FAILURES_FILE)
+
+def get_playback_failure_store():
+    """Zeitpunkt der letzten fehlgeschlagenen Wiedergabe pro Video."""
+    return runtime.get_record_store(recheck.TimestampStore, PLAYBACK_FAILURES_FILE)
+
+def record_checks(checked, failed):
+    """Speichert {video_id: zeitpunkt} erfolgreicher bzw. fehlgeschlagener Abfragen."""
+    try:
+        get_check_store().add(checked)
+        get_failure_store().add(failed)
+    except Exception as e:
+        log('Error saving check times: {}'.format(str(e)))
+
+def update_dead_bitmaps(statuses):
+    """Traegt geaenderte Status {video_id: status} in die Bitmaps aller Kanaele ein.
+
+    Gibt die Anzahl geaenderter Kanaele zurueck.
+    """
+    changed = 0
+    for channel_id, video_ids in catalog.iter_channels():
+        dead = load_dead_bitmap(channel_id, len(video_ids))
+        before = dead.bits[:] if dead is not None else None
+        for index, video_id in enumerate(video_ids):
+            status = statuses.get(video_id)
+            if status is None:
+                continue
+            if status in availability.DEAD_STATUSES:
+                if dead is None:
+                    dead = availability.DeadBitmap(len(video_ids))
+                dead.mark(index)
+            elif dead is not None:
+                dead.clear(index)
+        if dead is not None and dead.bits != before:
+            save_dead_bitmap(channel_id, dead)
+            changed += 1
+    return changed
+
+def run_availability_check(is_cancelled, interval=RECHECK_INTERVAL):
+    """Prüft einen Teil des Katalogs erneut (vom Dienst alle interval Sekunden aufgerufen).
+
+    Die Anzahl der Anfragen richtet sich nach dem Tagesbudget; die Auswahl
+    nach Priorität (siehe recheck.py). Gibt die Anzahl der Anfragen zurück.
+    """
+    try:
+        per_day = get_setting_int('recheck_budget')
+        # Ohne "Video-Titel laden" schickt das Addon keine oEmbed-Anfragen
+        if not per_day or not get_setting_bool('fetch_metadata'):
+            return 0
+        ensure_addon_data_folder()
+        budget = recheck.DailyBudget(RECHECK_BUDGET_FILE, per_day)
+        now = int(time.time())
+        limit = budget.allowance(now, interval)
+        if not limit:
+            return 0
+        
+        open_cache()
+        video_ids = get_unique_ids()
+        check_store = get_check_store()
+        failure_store = get_failure_store()
+        playback_store = get_playback_failure_store()
+        check_store.refresh()
+        failure_store.refresh()
+        playback_store.refresh()
+        played_keys = set(history.load_keys(PLAYED_FILE))
+        played_keys.update(history.load_keys(PLAY_HISTORY_FILE))
+        played_keys.update(history.load_keys(SESSION_HISTORY_FILE))
+        candidates = recheck.select_candidates(video_ids, check_store, failure_store, played_keys, limit, now,
+                                               playback_store)
+        
+        limiter = durations.RateLimiter(RECHECK_RATE)
+        checked = {}
+        failed = {}
+        statuses = {}
+        updated = {}
+        for video_id in candidates:
+            if is_cancelled():
+                break
+            limiter.wait()
+            info = fetch_video_info(video_id)
+            if info.status == STATUS_FALLBACK:
+                # Vorübergehender Fehler: vorhandene Metadaten behalten
+                failed[video_id] = now
+                continue
+            checked[video_id] = now
+            old = VIDEO_INFO_CACHE.get(video_id)
+            if (old is not None and old.status == STATUS_UNPLAYABLE and info.status == STATUS_OK
+                    and now - playback_store.get(video_id, 0) < recheck.UNPLAYABLE_RETRY_AGE):
+                # oEmbed kennt das Video, abgespielt werden konnte es aber nicht;
+                # nach UNPLAYABLE_RETRY_AGE wird es erneut geprüft
+                continue
+            statuses[video_id] = info.status
+            if old is None or old.status != info.status or old.full_title != info.full_title:
+                VIDEO_INFO_CACHE[video_id] = info
+                updated[video_id] = songs.info_song_id(info)
+        
+        budget.spend(len(checked) + len(failed))
+        if updated:
+            save_cache_to_disk()
+            get_song_store().add(updated)
+        record_checks(checked, failed)
+        changed = update_dead_bitmaps(statuses) if statuses else 0
+        dead = sum(1 for status in statuses.values() if status in availability.DEAD_STATUSES)
+        log('Availability check: {} checked, {} unavailable, {} failed, {} channels updated'.format(
+            len(checked), dead, len(failed), changed))
+        log('Availability coverage: {}'.format(
+            recheck.format_histogram(recheck.age_histogram(video_ids, check_store, now))))
+        return len(checked) + len(failed)
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+        return 0
+
+def get_playlist_video_id(playlist, position):
+    """Video-ID des Playlist-Eintrags an position (None wenn es kein YouTube-Video ist)."""
+    if position < 0 or position >= playlist.size():
+        return None
+    return get_path_video_id(playlist[position].getPath())
+
+def get_session_video_id():
+    """Video-ID des laufenden Playlist-Eintrags, wenn die Playlist zur
+    Wiedergabe-Session (PLAY_SESSION_FILE) gehört; sonst None (z.B.
+    Bibliothek, Live-TV über PVR oder Playlisten anderer Addons)."""
+    state = playqueue.load_state(PLAY_SESSION_FILE)
+    if state is None:
+        return None
+    playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+    if not playqueue.owns_playlist(state, playlist.size()):
+        return None
+    return get_playlist_video_id(playlist, playlist.getposition())
+
+def get_path_video_id(path):
+    """Video-ID aus einer YouTube-Plugin-URL (None wenn es keine ist)."""
+    match = _VIDEO_ID_PARAM.search(path or '')
+    return match.group(1) if match else None
+
+def record_played(video_id):
+    """Merkt sich ein gespieltes Video für die Verfügbarkeits-Prüfung (vom Dienst
+    aufgerufen, für alle Arten der Wiedergabe: Liste, Session, Live, Bibliothek)."""
+    try:
+        ensure_addon_data_folder()
+        played = history.load_history(PLAYED_FILE, PLAYED_HISTORY_SIZE)
+        played.add(video_id)
+        history.save_history(PLAYED_FILE, played)
+    except Exception as e:
+        log('Error recording played video {}: {}'.format(video_id, str(e)))
+
+def mark_playback_failure(video_id):
+    """Wertet eine fehlgeschlagene Wiedergabe aus einer Session aus (vom Dienst
+    außerhalb der Player-Callbacks aufgerufen).
+
+    Das Video fällt sofort aus der Rotation: Eine oEmbed-Anfrage prüft, ob es
+    gelöscht oder privat ist, und trägt dann diesen Status ein; sonst wird es
+    als nicht abspielbar markiert. Die Prüfung im Dienst gibt ihm nach
+    recheck.UNPLAYABLE_RETRY_AGE eine neue Chance. Videos, die nicht im Katalog
+    stehen, werden ignoriert.
+    """
+    try:
+        if not any(video_id in video_ids for _, video_ids in catalog.iter_channels()):
+            log('Playback of {} failed, not in catalog'.format(video_id))
+            return
+        now = int(time.time())
+        open_cache()
+        old = VIDEO_INFO_CACHE.get(video_id)
+        if old is not None and old.status in availability.DEAD_STATUSES:
+            return
+        get_playback_failure_store().add({video_id: now})
+        record_checks({}, {video_id: now})
+        
+        info = fetch_video_info(video_id)
+        if info.status in availability.DEAD_STATUSES:
+            # Eindeutiges Ergebnis; gilt als Prüfung
+            record_checks({video_id: int(time.time())}, {})
+        else:
+            # oEmbed kennt das Video (oder antwortet nicht): keine Prüfung eintragen,
+            # damit der Fehler bei der Prüfung im Dienst Vorrang behält
+            known = info if info.status == STATUS_OK else old
+            if known is not None and known.status == STATUS_OK:
+                info = VideoInfo(video_id, known.artist, known.title, known.full_title, STATUS_UNPLAYABLE)
+            else:
+                info = fallback_info(video_id, STATUS_UNPLAYABLE)
+        VIDEO_INFO_CACHE[video_id] = info
+        save_cache_to_disk()
+        update_dead_bitmaps({video_id: info.status})
+        log('Playback of {} failed, marked with status {}'.format(video_id, info.status))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def iter_library_ids():
+    """Liefert (channel_id, video_ids) mit den abspielbaren Videos, die beim
+    Export unter diesem Kanal stehen (jedes Video nur bei seinem ersten Kanal)."""
+    catalog_manifest = get_manifest()
+    seen = set()
+    for channel_id, video_ids in catalog.iter_channels():
+        dead = load_dead_bitmap(channel_id, len(video_ids))
+        if dead is not None:
+            video_ids = dead.filter(video_ids)
+        video_ids = [video_id for video_id in dict.fromkeys(video_ids)
+                     if catalog_manifest.is_primary(video_id, channel_id) and video_id not in seen]
+        seen.update(video_ids)
+        yield channel_id, video_ids
+
+def iter_library_entries(layout):
+    """Liefert die Bibliotheks-Einträge aller abspielbaren Videos, jedes Video
+    einmal (bei seinem ersten Kanal), kanalweise aus dem Cache gelesen."""
+    catalog_manifest = get_manifest()
+    for channel_id, video_ids in iter_library_ids():
+        channel_name = CHANNEL_NAMES.get(channel_id, channel_id.title())
+        batch_size = VIDEO_INFO_CACHE.preload_batch_size(len(video_ids))
+        for idx, video_id in enumerate(video_ids):
+            if idx % batch_size == 0:
+                VIDEO_INFO_CACHE.preload(video_ids[idx:idx + batch_size])
+            info = VIDEO_INFO_CACHE.get(video_id) or fallback_info(video_id)
+            other_names = [CHANNEL_NAMES.get(other, other.title())
+                           for other in catalog_manifest.also_in(video_id, channel_id)]
+            yield library.build_entry(info, channel_name, other_names, layout,
+                                      'plugin://plugin.video.youtube/play/?video_id={}'.format(video_id))
+
+def export_library():
+    """Exportiert alle Kanäle als .strm/.nfo-Dateien in den eingestellten Ordner.
+
+    Nur neue oder geänderte Videos werden geschrieben; Dateien nicht mehr
+    verfügbarer Videos werden gelöscht. Danach aktualisiert Kodi die Bibliothek.
+    """
+    try:
+        root = ADDON.getSetting('library_path')
+        if not root:
+            xbmcgui.Dialog().notification(ADDON_NAME, 'Kein Ordner für die Bibliothek eingestellt',
+                                          xbmcgui.NOTIFICATION_WARNING)
+            return
+        ensure_addon_data_folder()
+        open_cache()
+        export = library.LibraryExport(xbmcvfs.translatePath(root), LIBRARY_STATE_FILE)
+        # Gesamtzahl ohne nicht abspielbare Videos, die der Export überspringt
+        total = sum(len(video_ids) for _, video_ids in iter_library_ids())
+        progress = FetchProgress(xbmcgui.DialogProgressBG(), '{} - Bibliothek'.format(ADDON_NAME), total)
+        try:
+            written, unchanged, deleted, cancelled = export.sync(
+                iter_library_entries(get_setting_int('library_layout')),
+                is_cancelled=make_cancel_check(claim_request_token(JOB_LIBRARY), JOB_LIBRARY),
+                on_progress=progress.update)
+        finally:
+            progress.close()
+        log('Library export: {} written, {} unchanged, {} deleted{}'.format(
+            written, unchanged, deleted, ' (cancelled)' if cancelled else ''))
+        if written or deleted:
+            xbmc.executebuiltin('UpdateLibrary(video,{})'.format(root))
+        xbmcgui.Dialog().notification(ADDON_NAME, '{} neu/geändert, {} gelöscht'.format(written, deleted))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def show_availability_report():
+    """Zeigt, wie aktuell die Verfügbarkeitsdaten des Katalogs sind."""
+    try:
+        video_ids = get_unique_ids()
+        check_store = get_check_store()
+        check_store.refresh()
+        histogram = recheck.age_histogram(video_ids, check_store, int(time.time()))
+        dead = 0
+        for channel_id, channel_video_ids in catalog.iter_channels():
+            bitmap = load_dead_bitmap(channel_id, len(channel_video_ids))
+            if bitmap is not None:
+                dead += bitmap.count()
+        lines = ['{} Videos, zuletzt geprüft:'.format(len(video_ids))]
+        lines.extend('{}: {}'.format(label, count) for label, count in histogram)
+        lines.append('Nicht verfügbar (alle Kanäle): {}'.format(dead))
+        xbmcgui.Dialog().ok(ADDON_NAME, '\n'.join(lines))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def set_video_info(list_item, title, plot, mediatype, artist=None, genre=None):
+    """Setzt Video-Infos über die InfoTagVideo-Setter (Kodi 20+), sonst über setInfo."""
+    if USE_INFO_TAG:
+        tag = list_item.getVideoInfoTag()
+        tag.setTitle(title)
+        tag.setPlot(plot)
+        tag.setMediaType(mediatype)
+        if artist is not None:
+            tag.setArtists([artist])
+        if genre is not None:
+            tag.setGenres([genre])
+    else:
+        info = {'title': title, 'plot': plot, 'mediatype': mediatype}
+        if artist is not None:
+            info['artist'] = [artist]
+        if genre is not None:
+            info['genre'] = genre
+        list_item.setInfo('video', info)
+
+def build_video_items(rows):
+    """Baut aus Zeilen (url, label, title, artist, plot, thumb, poster, also_in) die
+    (url, listitem, isFolder)-Tupel für addDirectoryItems."""
+    items = []
+    for url, label, title, artist, plot, thumb, poster, also_in in rows:
+        item = xbmcgui.ListItem(label=label, offscreen=True)
+        if also_in:
+            item.setProperty('also_in', also_in)
+            plot = '{}\n\nAuch in: {}'.format(plot, also_in)
+        set_video_info(item, title, plot, 'musicvideo', artist=artist, genre='Music')
+        item.setArt({
+            'thumb': thumb,
+            'poster': poster
+        })
+        items.append((url, item, False))
+    return items
+
+def get_song_store():
+    """Song-IDs pro Video (erkennt mehrfach hochgeladene Songs, siehe songs.py)."""
+    return runtime.get_record_store(songs.SongStore, SONGS_FILE)
+
+def assign_song_ids(video_ids):
+    """Ordnet Videos mit Metadaten im Cache ihre Song-ID zu (nur noch fehlende).
+
+    Videos ohne Cache-Eintrag bleiben offen und werden nach dem Laden zugeordnet.
+    """
+    store = get_song_store()
+    missing_ids = store.missing_ids(video_ids)
+    if missing_ids:
+        # Im Speicherspar-Modus blockweise vorladen statt einen Shard pro ID zu lesen
+        infos = []
+        batch_size = VIDEO_INFO_CACHE.preload_batch_size(len(missing_ids))
+        for start in range(0, len(missing_ids), batch_size):
+            batch = missing_ids[start:start + batch_size]
+            if len(batch) > 1:
+                VIDEO_INFO_CACHE.preload(batch)
+            infos.extend((video_id, VIDEO_INFO_CACHE.get(video_id)) for video_id in batch)
+        store.add(songs.cluster((video_id, info) for video_id, info in infos if info is not None))
+    return store
+
+def get_history_file():
+    """Datei des No-Repeat-Fensters: pro Session oder pro Profil (Setting)."""
+    if get_setting_int('no_repeat_scope') == 1:
+        return PLAY_HISTORY_FILE
+    return SESSION_HISTORY_FILE
+
+def take_session_ids(state, count):
+    """Gibt die nächsten count IDs einer Wiedergabe-Session zurück und rückt sie weiter.
+
+    Zufällige Ziehungen überspringen die zuletzt gespielten Videos (No-Repeat-Fenster),
+    auch andere Uploads desselben Songs.
+    """
+    scope = state['scope']
+    if state['mode'] in (playqueue.MODE_SEQUENTIAL, playqueue.MODE_LIVE):
+        channel_ids = get_playable_ids(scope) or []
+        position = state['position']
+        if state['mode'] == playqueue.MODE_LIVE and channel_ids:
+            # Live-Kanäle laufen in einer Endlosschleife
+            video_ids = [channel_ids[(position + i) % len(channel_ids)] for i in range(count)]
+        else:
+            video_ids = channel_ids[position:position + count]
+        state['position'] = position + len(video_ids)
+        return video_ids
+    
+    open_cache()
+    song_store = get_song_store()
+    history_file = get_history_file()
+    recent = history.load_history(history_file, get_setting_int('no_repeat_count'), song_store.get_key)
+    
+    def with_song_id(video_id):
+        # Song-ID vor dem Vergleich mit der Historie ermitteln
+        if video_id is not None:
+            assign_song_ids([video_id])
+        return video_id
+    
+    # Tote Videos sind None (Indizes bleiben erhalten) und werden übersprungen
+    if state['mode'] == playqueue.MODE_SHUFFLE:
+        # Die Reihenfolge wird nicht gemischt, sondern pro Position berechnet
+        if scope == shuffle.SCOPE_ALL:
+            items = shuffle.ChannelSpace(get_channel_counts(), lambda channel_id: get_playable_ids(channel_id, True))
+        else:
+            items = get_playable_ids(scope, True) or []
+        states = shuffle.load_sessions(SHUFFLE_STATE_FILE)
+        session = shuffle.open_session(states, scope, items)
+        log('Shuffle {}: position {} of {}'.format(scope, session.position, len(items)))
+        
+        def draw():
+            for _ in range(len(items)):
+                video_id = session.take(1)[0]
+                if video_id is not None:
+                    return with_song_id(video_id)
+            return None
+        video_ids = history.draw_fresh(draw, count, recent, len(items))
+        states[scope] = session.to_state()
+        shuffle.save_sessions(SHUFFLE_STATE_FILE, states)
+    else:
+        # Gewichtete Kanalwahl; Gewichte werden bei jedem Auffüllen neu gelesen
+        sampler = runtime.get_mix_sampler(parse_weights(ADDON.getSetting('mix_weights')), get_channel_counts())
+        if not sampler:
+            log('Mix: no valid channels in weights')
+            return []
+        channels = {}
+        
+        def draw():
+            for _ in range(MIX_MAX_REJECTS):
+                channel_id, index = sampler.draw()
+                if channel_id not in channels:
+                    channels[channel_id] = get_playable_ids(channel_id, True)
+                if channels[channel_id][index] is not None:
+                    return with_song_id(channels[channel_id][index])
+            return None
+        video_ids = history.draw_fresh(draw, count, recent, MIX_MAX_REJECTS * count)
+    
+    history.save_history(history_file, recent)
+    return video_ids
+
+def queue_session_videos(playlist, state, count, start_offset=0):
+    """Hängt bis zu count Videos der Session an die Playlist an und speichert den Zustand.
+
+    start_offset (Sekunden) gilt für das erste angehängte Video.
+    """
+    video_ids = take_session_ids(state, count)
+    if video_ids:
+        fetch_metadata = get_setting_bool('fetch_metadata')
+        if fetch_metadata:
+            open_cache()
+        # "Auch in" ohne den Kanal der Session (bei Mix und allen Kanälen gibt es keinen)
+        scope = state['scope']
+        channel_id = scope if scope not in (None, shuffle.SCOPE_ALL) else None
+        items = build_video_items(build_channel_rows(video_ids, fetch_metadata, channel_id=channel_id))
+        if start_offset:
+            items[0][1].setProperty('StartOffset', str(start_offset))
+        for url, item, _ in items:
+            playlist.add(url, item)
+    
+    state['size'] = playlist.size()
+    playqueue.save_state(PLAY_SESSION_FILE, state)
+    return len(video_ids)
+
+def start_play_session(state, start_offset=0):
+    """Startet die Wiedergabe mit dem aktuellen Video plus einem Fenster an Folgevideos.
+
+    Den Rest hängt der Dienst (service.py) während der Wiedergabe an.
+    """
+    try:
+        ensure_addon_data_folder()
+        if xbmcvfs.exists(SESSION_HISTORY_FILE):
+            xbmcvfs.delete(SESSION_HISTORY_FILE)
+        playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+        playlist.clear()
+        if queue_session_videos(playlist, state, playqueue.WINDOW_SIZE + 1, start_offset):
+            xbmc.Player().play(playlist)
+        else:
+            log('Play session {} {} is empty'.format(state['mode'], state['scope']))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def get_live_schedule(channel_id):
+    """Sendeplan eines Kanals aus den abspielbaren Videos (None wenn leer)."""
+    video_ids = get_playable_ids(channel_id)
+    if not video_ids:
+        return None
+    store = runtime.get_record_store(durations.DurationStore, DURATIONS_FILE)
+    # Digest statt Anzahl: fällt ein Video weg und ein anderes kommt zurück, bleibt die Anzahl gleich
+    digest = hashlib.blake2b('\n'.join(video_ids).encode('utf-8'), digest_size=8).hexdigest()
+    return runtime.get_schedule(channel_id, video_ids, store, (digest, store.version))
+
+def describe_programme(video_id):
+    """(titel, beschreibung, bild-url) eines Videos für das Live-TV-Programm."""
+    info = VIDEO_INFO_CACHE.get(video_id) or fallback_info(video_id)
+    return '{} - {}'.format(info.artist, info.title), info.plot, info.thumb
+
+def update_live_tv(notify=False):
+    """Schreibt die M3U-Playlist und schreibt das XMLTV-Programm bis
+    epg_days Tage ab heute fort (vom Dienst und über die Einstellungen aufgerufen)."""
+    try:
+        ensure_addon_data_folder()
+        open_cache()
+        folder = xbmcvfs.translatePath(ADDON.getSetting('pvr_path')) or ADDON_DATA_PATH
+        channels = []
+        for channel_id in get_manifest().channel_ids:
+            schedule = get_live_schedule(channel_id)
+            if schedule is not None:
+                channels.append((channel_id, CHANNEL_NAMES.get(channel_id, channel_id.title()), schedule))
+        
+        epg.write_m3u(os.path.join(folder, LIVE_TV_M3U_NAME),
+                      [(channel_id, name, get_plugin_url(action='live', channel=channel_id))
+                       for channel_id, name, _ in channels])
+        guide = epg.Guide(os.path.join(folder, LIVE_TV_GUIDE_NAME), GUIDE_STATE_FILE)
+        rewritten, days = guide.update(channels, describe_programme, max(get_setting_int('epg_days'), 1),
+                                      preload=VIDEO_INFO_CACHE.preload)
+        if days:
+            log('Live TV guide: {} {} days for {} channels'.format(
+                'wrote' if rewritten else 'appended', days, len(channels)))
+        if notify:
+            xbmcgui.Dialog().notification(ADDON_NAME, 'Live-TV-Dateien in {} aktualisiert'.format(folder))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def start_live_channel(handle, channel_id, session=False):
+    """Schaltet einen Kanal wie einen Fernsehsender ein: Es startet das Video,
+    das laut Sendeplan gerade läuft, an der passenden Stelle.
+
+    Mit session (Eintrag "Live einschalten" im Addon) läuft der Kanal als
+    Playlist-Session weiter. Sonst (M3U-Playlist für PVR IPTV Simple Client)
+    wird die URL über setResolvedUrl zum laufenden Video aufgelöst.
+    """
+    resolve = handle >= 0 and not session
+    schedule = get_live_schedule(channel_id)
+    if schedule is None:
+        log('Live: channel not found: {}'.format(channel_id))
+        if resolve:
+            xbmcplugin.setResolvedUrl(handle, False, xbmcgui.ListItem(offscreen=True))
+        return
+    
+    index, offset = schedule.locate()
+    log('Live {}: video {} of {} at {}s'.format(channel_id, index + 1, len(schedule), offset))
+    if not resolve:
+        start_play_session(playqueue.new_state(playqueue.MODE_LIVE, channel_id, index), offset)
+        return
+    
+    fetch_metadata = get_setting_bool('fetch_metadata')
+    if fetch_metadata:
+        open_cache()
+    url, item, _ = build_video_items(build_channel_rows([schedule.video_ids[index]], fetch_metadata,
+                                                        channel_id=channel_id))[0]
+    item.setPath(url)
+    item.setProperty('StartOffset', str(offset))
+    xbmcplugin.setResolvedUrl(handle, True, item)
+
+def get_duration_source():
+    """Quelle für Videolängen laut Setting (None = keine konfiguriert)."""
+    source = get_setting_int('duration_source')
+    if source == 1:
+        api_key = ADDON.getSetting('youtube_api_key').strip()
+        if api_key:
+            return durations.YouTubeApiSource(api_key)
+        log('Durations: no YouTube API key configured')
+    elif source == 2:
+        path = xbmcvfs.translatePath(ADDON.getSetting('duration_file'))
+        if path and xbmcvfs.exists(path):
+            return durations.JsonFileSource(path)
+        log('Durations: file not found: {}'.format(path))
+    return None
+
+def enrich_durations():
+    """Lädt fehlende Videolängen aller Kanäle (unabhängig vom Laden der Titel).
+
+    Jeder Batch wird sofort gespeichert; ein abgebrochener Lauf setzt beim
+    nächsten Aufruf mit den noch fehlenden Videos fort.
+    """
+    try:
+        source = get_duration_source()
+        if source is None:
+            xbmcgui.Dialog().notification(ADDON_NAME, 'Keine Quelle für Videolängen eingestellt',
+                                          xbmcgui.NOTIFICATION_WARNING)
+            return
+        
+        ensure_addon_data_folder()
+        store = runtime.get_record_store(durations.DurationStore, DURATIONS_FILE)
+        missing_ids = store.missing_ids(get_unique_ids())
+        log('Durations: {} known, {} missing'.format(len(store), len(missing_ids)))
+        if not missing_ids:
+            return
+        
+        progress = FetchProgress(xbmcgui.DialogProgressBG(), '{} - Videolängen'.format(ADDON_NAME), len(missing_ids))
+        try:
+            stored, cancelled = durations.enrich(
+                source, store, missing_ids, on_batch=lambda done, total: progress.update(done),
+                workers=DURATION_WORKERS, rate=get_setting_int('duration_rate'),
+                is_cancelled=make_cancel_check(claim_request_token(JOB_DURATIONS), JOB_DURATIONS))
+        finally:
+            progress.close()
+        log('Durations: stored {} of {}{}'.format(stored, len(missing_ids), ' (cancelled)' if cancelled else ''))
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+
+def feed_play_queue():
+    """Füllt das Fenster der laufenden Session auf (vom Dienst aufgerufen).
+
+    Gibt die Anzahl angehängter Videos zurück.
+    """
+    try:
+        state = playqueue.load_state(PLAY_SESSION_FILE)
+        if state is None:
+            return 0
+        
+        playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+        count = playqueue.missing_count(state, playlist.size(), playlist.getposition())
+        if not count:
+            return 0
+        
+        added = queue_session_videos(playlist, state, count)
+        log('Queued {} more videos ({} {})'.format(added, state['mode'], state['scope']))
+        return added
+    except Exception as e:
+        log('ERROR: {}'.format(str(e)))
+        log(traceback.format_exc())
+        return 0
 
 def list_channels(handle):
     """Zeigt die Hauptkategorien an."""
     try:
         log('=== LIST CHANNELS START ===')
         
-        playlists = get_playlists()
+        with TIMER.span('manifest'):
+            catalog_manifest = get_manifest()
+        channel_counts = catalog_manifest.counts
+        items = []
         
-        if playlists:
-            channel_names = {
-                '1stday': '1st Day (1981)',
-                '70s': '1970s',
-                '80s': '1980s', 
-                '90s': '1990s',
-                '2000s': '2000s',
-                '2010s': '2010s',
-                '2020s': '2020s',
-                'trl': 'TRL (Total Request Live)',
-                'raps': 'Yo! MTV Raps',
-                'metal': 'Headbangers Ball',
-                '120minutes': '120 Minutes (Alternative)',
-                'unplugged': 'MTV Unplugged',
-                'club': 'Club MTV / Dance',
-                'commercials': 'MTV Commercials',
-            }
-            
-            priority = ['1stday', '70s', '80s', '90s', '2000s', '2010s', '2020s', 'trl', 
-                       'raps', 'metal', '120minutes', 'unplugged', 'club', 'commercials']
-            
-            for channel_id in priority:
-                if channel_id in playlists:
-                    video_ids = playlists[channel_id]
-                    display_name = channel_names.get(channel_id, channel_id.title())
-                    
-                    list_item = xbmcgui.ListItem(label=display_name)
-                    list_item.setInfo('video', {
-                        'title': display_name,
-                        'genre': 'Music',
-                        'plot': '{} Videos verfuegbar'.format(len(video_ids)),
-                        'mediatype': 'video'
-                    })
-                    list_item.setArt({
-                        'icon': 'DefaultMusicVideos.png',
-                        'fanart': 'DefaultMusicVideos.png'
-                    })
-                    url = get_url(action='browse', channel=channel_id)
-                    xbmcplugin.addDirectoryItem(handle, url, list_item, True)
-            
-            for channel_id in sorted(playlists.keys()):
-                if channel_id not in priority:
-                    video_ids = playlists[channel_id]
-                    display_name = channel_names.get(channel_id, channel_id.title())
-                    
-                    list_item = xbmcgui.ListItem(label=display_name)
-                    list_item.setInfo('video', {
-                        'title': display_name,
-                        'genre': 'Music',
-                        'plot': '{} Videos'.format(len(video_ids)),
-                        'mediatype': 'video'
-                    })
-                    list_item.setArt({
-                        'icon': 'DefaultMusicVideos.png',
-                        'fanart': 'DefaultMusicVideos.png'
-                    })
-                    url = get_url(action='browse', channel=channel_id)
-                    xbmcplugin.addDirectoryItem(handle, url, list_item, True)
-        else:
-            error_item = xbmcgui.ListItem(label='[COLOR red]Keine Daten[/COLOR]')
-            xbmcplugin.addDirectoryItem(handle, '', error_item, False)
+        with TIMER.span('items'):
+            if channel_counts:
+                shuffle_item = xbmcgui.ListItem(label='[COLOR blue]Alles zufällig abspielen[/COLOR]', offscreen=True)
+                set_video_info(shuffle_item, 'Alles zufällig abspielen', '{} verschiedene Videos aus allen Kanälen in zufälliger Reihenfolge'.format(
+                    catalog_manifest.unique), 'video')
+                items.append((get_url(action='shuffle'), shuffle_item, False))
+                
+                mix_item = xbmcgui.ListItem(label='[COLOR blue]Mix abspielen[/COLOR]', offscreen=True)
+                set_video_info(mix_item, 'Mix abspielen', 'Gewichtete Rotation über mehrere Kanäle (siehe Einstellungen)', 'video')
+                items.append((get_url(action='mix'), mix_item, False))
+                
+                priority = ['1stday', '70s', '80s', '90s', '2000s', '2010s', '2020s', 'trl', 
+                           'raps', 'metal', '120minutes', 'unplugged', 'club', 'commercials']
+                
+                for channel_id in priority:
+                    if channel_id in channel_counts:
+                        video_count = channel_counts[channel_id]
+                        display_name = CHANNEL_NAMES.get(channel_id, channel_id.title())
+                        
+                        list_item = xbmcgui.ListItem(label=display_name, offscreen=True)
+                        plot = '{} Videos verfuegbar, {} davon nur in diesem Kanal'.format(
+                            video_count, catalog_manifest.exclusive.get(channel_id, 0))
+                        set_video_info(list_item, display_name, plot, 'video', genre='Music')
+                        list_item.setArt({
+                            'icon': 'DefaultMusicVideos.png',
+                            'fanart': 'DefaultMusicVideos.png'
+                        })
+                        url = get_url(action='browse', channel=channel_id)
+                        items.append((url, list_item, True))
+                
+                for channel_id in sorted(channel_counts.keys()):
+                    if channel_id not in priority:
+                        video_count = channel_counts[channel_id]
+                        display_name = CHANNEL_NAMES.get(channel_id, channel_id.title())
+                        
+                        list_item = xbmcgui.ListItem(label=display_name, offscreen=True)
+                        plot = '{} Videos, {} davon nur in diesem Kanal'.format(
+                            video_count, catalog_manifest.exclusive.get(channel_id, 0))
+                        set_video_info(list_item, display_name, plot, 'video', genre='Music')
+                        list_item.setArt({
+                            'icon': 'DefaultMusicVideos.png',
+                            'fanart': 'DefaultMusicVideos.png'
+                        })
+                        url = get_url(action='browse', channel=channel_id)
+                        items.append((url, list_item, True))
+            else:
+                error_item = xbmcgui.ListItem(label='[COLOR red]Keine Daten[/COLOR]')
+                items.append(('', error_item, False))
         
-        xbmcplugin.endOfDirectory(handle, succeeded=True)
+        with TIMER.span('add_items'):
+            xbmcplugin.addDirectoryItems(handle, items, len(items))
+        with TIMER.span('end_of_directory'):
+            xbmcplugin.endOfDirectory(handle, succeeded=True)
+        TIMER.mark('visible')
         log('=== LIST CHANNELS END ===')
         
     except Exception as e:
@@ -224,98 +1146,260 @@ def list_channels(handle):
         log(traceback.format_exc())
         xbmcplugin.endOfDirectory(handle, succeeded=False)
 
-def browse_channel(handle, channel_id):
-    """Zeigt Videos eines Kanals an."""
+def build_channel_rows(video_ids, fetch_metadata, first_index=1, channel_id=None, statuses=None):
+    """Berechnet die Zeilen (url, label, title, artist, plot, thumb, poster, also_in) eines Kanals.
+
+    also_in nennt die anderen Kanäle, in denen das Video ebenfalls steht. In
+    statuses (falls übergeben) wird der Status jedes Videos angehängt (None ohne Metadaten).
+
+    Metadaten werden nur aus dem Cache gelesen; fehlende Einträge müssen
+    vorher mit fetch_missing_metadata geladen werden.
+    """
+    # Im Speicherspar-Modus wird der Cache blockweise vorgeladen
+    batch_size = VIDEO_INFO_CACHE.preload_batch_size(len(video_ids))
+    catalog_manifest = get_manifest()
+    
+    rows = []
+    
+    # Videos
+    for idx, video_id in enumerate(video_ids, 1):
+        if fetch_metadata:
+            if (idx - 1) % batch_size == 0:
+                VIDEO_INFO_CACHE.preload(video_ids[idx - 1:idx - 1 + batch_size])
+            
+            video_info = VIDEO_INFO_CACHE.get(video_id) or fallback_info(video_id)
+            if statuses is not None:
+                statuses.append(video_info.status)
+            
+            label = '{} - {}'.format(video_info.artist, video_info.title)
+            title = video_info.title
+            artist = video_info.artist
+            plot = video_info.plot
+            thumb = video_info.thumb
+            poster = video_info.poster
+        else:
+            # Schnelle Anzeige ohne Metadaten
+            if statuses is not None:
+                statuses.append(None)
+            label = 'Music Video #{}'.format(first_index + idx - 1)
+            title = label
+            artist = 'Unknown'
+            plot = 'YouTube Video ID: {}'.format(video_id)
+            thumb = thumb_url(video_id)
+            poster = poster_url(video_id)
+        
+        also_in = ', '.join(CHANNEL_NAMES.get(other, other.title())
+                            for other in catalog_manifest.also_in(video_id, channel_id))
+        
+        youtube_url = 'plugin://plugin.video.youtube/play/?video_id={}'.format(video_id)
+        rows.append((youtube_url, label, title, artist, plot, thumb, poster, also_in))
+    
+    return rows
+
+def prefetch_in_background(is_cancelled):
+    """Lädt nach dem Anzeigen der Liste die übrigen Metadaten: angrenzende
+    Seiten, Rest des Kanals und zuletzt alle anderen Kanäle."""
+    if not MEMORY_BUDGET_MB:
+        # Andere Kanäle nur ohne Speicherbudget einreihen (braucht alle IDs und Shards)
+        load_cache_from_disk()
+        catalog_manifest = get_manifest()
+        for channel_id, video_ids in get_playlists().items():
+            # Jedes Video nur über seinen ersten Kanal einreihen
+            video_ids = [video_id for video_id in video_ids
+                         if catalog_manifest.is_primary(video_id, channel_id)]
+            FETCH_QUEUE.push(VIDEO_INFO_CACHE.missing_ids(video_ids), PRIORITY_OTHER)
+            # Bereits gecachte Videos, die noch keine Song-ID haben (ältere Caches)
+            assign_song_ids(video_ids)
+    
+    if len(FETCH_QUEUE):
+        log('Background prefetch of {} videos'.format(len(FETCH_QUEUE)))
+        fetch_missing_metadata(is_cancelled, save_every=100)
+
+def add_channel_items_in_batches(handle, all_ids, dead, first, count, fetch_metadata, channel_id, total_items):
+    """Speicherspar-Modus: übergibt die Videos einer Seite blockweise an Kodi.
+
+    Die Status-Werte des ganzen Kanals werden Shard für Shard gelesen, Zeilen
+    aber nur für die Positionen first bis first + count gebaut (gezählt ohne
+    die Videos in dead). Gibt die Status-Werte aller Videos des Kanals zurück.
+    """
+    if fetch_metadata:
+        statuses = VIDEO_INFO_CACHE.statuses(all_ids)
+    else:
+        statuses = [None] * len(all_ids)
+    
+    page_ids = []
+    position = 0
+    for index, video_id in enumerate(all_ids):
+        if dead is not None and dead.is_dead(index):
+            continue
+        if position >= first + count:
+            break
+        if position >= first and statuses[index] not in availability.DEAD_STATUSES:
+            page_ids.append(video_id)
+        position += 1
+    
+    # Metadaten blockweise vorladen, Zeilen und ListItems in kleineren Blöcken übergeben
+    batch_size = VIDEO_INFO_CACHE.preload_batch_size(len(page_ids))
+    for start in range(0, len(page_ids), batch_size):
+        if fetch_metadata:
+            VIDEO_INFO_CACHE.preload(page_ids[start:start + batch_size])
+        for offset in range(start, min(start + batch_size, len(page_ids)), ITEMS_PER_BATCH):
+            rows = build_channel_rows(page_ids[offset:min(offset + ITEMS_PER_BATCH, start + batch_size)],
+                                      fetch_metadata, first + offset + 1, channel_id)
+            xbmcplugin.addDirectoryItems(handle, build_video_items(rows), total_items)
+    return statuses
+
+def browse_channel(handle, channel_id, page=0):
+    """Zeigt Videos eines Kanals an (bei gesetzter Seitengröße nur eine Seite)."""
+    is_cancelled = make_cancel_check(REQUEST.token)
+    
     try:
         log('=== BROWSE: {} ==='.format(channel_id))
         
-        # Lade Cache beim ersten Aufruf
-        if not VIDEO_INFO_CACHE:
-            load_cache_from_disk()
-        
         # Prüfe Setting
         fetch_metadata = get_setting_bool('fetch_metadata')
         log('Fetch metadata setting: {}'.format(fetch_metadata))
         
-        playlists = get_playlists()
+        with TIMER.span('playlists'):
+            all_ids = get_channel_ids(channel_id)
         
-        if channel_id in playlists:
-            video_ids = playlists[channel_id]
+        if all_ids is not None:
+            # Bekannte gelöschte/private Videos gar nicht erst anzeigen
+            dead = load_dead_bitmap(channel_id, len(all_ids))
+            video_ids = dead.filter(all_ids) if dead is not None else all_ids
             log('Showing {} videos'.format(len(video_ids)))
             
-            # Zähle wie viele Videos bereits gecached sind
-            cached_count = sum(1 for vid in video_ids if vid in VIDEO_INFO_CACHE)
+            # Sichtbare Seite und angrenzende Seiten
+            page_size = get_setting_int('page_size')
+            if page_size:
+                first = page * page_size
+                page_ids = video_ids[first:first + page_size]
+                near_ids = video_ids[max(first - page_size, 0):first] + \
+                    video_ids[first + page_size:first + 2 * page_size]
+            else:
+                first = 0
+                page_ids = video_ids
+                near_ids = []
+            
+            # Position im Änderungsprotokoll, bevor Metadaten gelesen werden
+            since = VIDEO_INFO_CACHE.change_position()
+            if fetch_metadata:
+                open_cache()
+            
+            # Unveränderter Kanal: gespeicherte Liste ohne Cache-Zugriffe verwenden.
+            # Im Speicherspar-Modus gibt es keine Snapshots (sie halten den ganzen Kanal).
+            rows = None
+            if not MEMORY_BUDGET_MB:
+                with TIMER.span('snapshot_load'):
+                    rows = load_channel_snapshot(channel_id, video_ids, fetch_metadata)
+            if rows is not None:
+                log('Using channel snapshot with {} rows'.format(len(rows)))
             
             # Info-Item
+            missing_ids = []
             if fetch_metadata:
-                if cached_count == len(video_ids):
+                if rows is None:
+                    # Lade nur die Cache-Shards, die dieser Kanal braucht
+                    with TIMER.span('cache_load'):
+                        load_cache_from_disk(video_ids[:VIDEO_INFO_CACHE.preload_batch_size(len(video_ids))])
+                        missing_ids = VIDEO_INFO_CACHE.missing_ids(video_ids)
+                
+                # Zähle wie viele Videos bereits gecached sind
+                cached_count = len(video_ids) - len(missing_ids)
+                
+                if not missing_ids:
                     info_text = '[COLOR green]{} Videos - Alle aus Cache[/COLOR]'.format(len(video_ids))
                     info_plot = 'Alle Video-Informationen sind bereits im Cache vorhanden.'
                 else:
                     info_text = '[COLOR yellow]{} Videos - {} aus Cache, {} werden geladen...[/COLOR]'.format(
-                        len(video_ids), cached_count, len(video_ids) - cached_count)
+                        len(video_ids), cached_count, len(missing_ids))
                     info_plot = 'Fehlende Video-Informationen werden von YouTube geladen und gecached.'
             else:
                 info_text = '[COLOR yellow]{} Videos[/COLOR]'.format(len(video_ids))
                 info_plot = 'Tipp: Aktiviere "Video-Titel laden" in den Addon-Einstellungen für Künstler & Titel.'
             
-            info = xbmcgui.ListItem(label=info_text)
-            info.setInfo('video', {'title': 'Info', 'plot': info_plot})
-            xbmcplugin.addDirectoryItem(handle, '', info, False)
+            info = xbmcgui.ListItem(label=info_text, offscreen=True)
+            set_video_info(info, 'Info', info_plot, 'video')
             
-            # Tracking für neue Metadaten
-            new_metadata_count = 0
+            if missing_ids:
+                # Sichtbare Videos zuerst; nur auf diese wird vor dem Anzeigen gewartet.
+                # Bricht ab, wenn der Benutzer weiternavigiert oder Kodi sich beendet.
+                queue_channel_fetches(video_ids, missing_ids, page_ids, near_ids)
+                with TIMER.span('fetch'):
+                    _, cancelled = fetch_missing_metadata(is_cancelled, PRIORITY_VISIBLE)
+                if cancelled:
+                    xbmcplugin.endOfDirectory(handle, succeeded=False)
+                    log('=== BROWSE CANCELLED ===')
+                    return
+                # Eben selbst geladene Videos machen den neuen Snapshot nicht ungültig
+                changed = VIDEO_INFO_CACHE.changed_since(since)
+                if changed is not None and changed.issubset(missing_ids):
+                    since = VIDEO_INFO_CACHE.change_position()
+                missing_ids = [video_id for video_id in missing_ids if video_id in FETCH_QUEUE]
             
-            # Videos
-            for idx, video_id in enumerate(video_ids, 1):
+            shuffle_item = xbmcgui.ListItem(label='[COLOR blue]Kanal zufällig abspielen[/COLOR]', offscreen=True)
+            set_video_info(shuffle_item, 'Kanal zufällig abspielen', 'Alle Videos dieses Kanals in zufälliger Reihenfolge', 'video')
+            play_item = xbmcgui.ListItem(label='[COLOR blue]Alle abspielen[/COLOR]', offscreen=True)
+            set_video_info(play_item, 'Alle abspielen', 'Alle Videos dieses Kanals ab dieser Seite der Reihe nach', 'video')
+            live_item = xbmcgui.ListItem(label='[COLOR blue]Live einschalten[/COLOR]', offscreen=True)
+            set_video_info(live_item, 'Live einschalten', 'Der Kanal läuft rund um die Uhr - einschalten wie beim Fernsehen', 'video')
+            items = [('', info, False),
+                     (get_url(action='live', channel=channel_id, session=1), live_item, False),
+                     (get_url(action='play', channel=channel_id, start=first), play_item, False),
+                     (get_url(action='shuffle', channel=channel_id), shuffle_item, False)]
+            
+            if MEMORY_BUDGET_MB:
+                # Speicherspar-Modus: Zeilen blockweise bauen und übergeben, statt den Kanal zu halten
+                total_items = len(items) + len(page_ids) + (1 if page_size and first + page_size < len(video_ids) else 0)
+                with TIMER.span('add_items'):
+                    xbmcplugin.addDirectoryItems(handle, items, total_items)
+                    statuses = add_channel_items_in_batches(handle, all_ids, dead, first, len(page_ids),
+                                                            fetch_metadata, channel_id, total_items)
+                items = []
+                if fetch_metadata and not missing_ids:
+                    new_dead = availability.DeadBitmap.from_statuses(statuses)
+                    if new_dead != dead:
+                        log('{} of {} videos unavailable'.format(new_dead.count(), len(all_ids)))
+                        save_dead_bitmap(channel_id, new_dead)
+                page_rows = None
+            elif rows is not None:
+                page_rows = rows[first:first + len(page_ids)]
+            elif not missing_ids:
+                statuses = []
+                with TIMER.span('rows'):
+                    rows = build_channel_rows(all_ids, fetch_metadata, channel_id=channel_id, statuses=statuses)
                 if fetch_metadata:
-                    # Hole Video-Infos (aus Cache oder von YouTube)
-                    was_cached = video_id in VIDEO_INFO_CACHE
-                    video_info = get_video_info_from_youtube(video_id)
-                    
-                    if not was_cached:
-                        new_metadata_count += 1
-                    
-                    label = '{} - {}'.format(video_info['artist'], video_info['title'])
-                    title = video_info['title']
-                    artist = video_info['artist']
-                    plot = video_info['plot']
-                    thumb = video_info['thumb']
-                    poster = video_info['poster']
-                else:
-                    # Schnelle Anzeige ohne Metadaten
-                    label = 'Music Video #{}'.format(idx)
-                    title = label
-                    artist = 'Unknown'
-                    plot = 'YouTube Video ID: {}'.format(video_id)
-                    thumb = 'https://i.ytimg.com/vi/{}/mqdefault.jpg'.format(video_id)
-                    poster = 'https://i.ytimg.com/vi/{}/hqdefault.jpg'.format(video_id)
-                
-                item = xbmcgui.ListItem(label=label)
-                item.setInfo('video', {
-                    'title': title,
-                    'artist': [artist],
-                    'genre': 'Music',
-                    'mediatype': 'musicvideo',
-                    'plot': plot
-                })
-                item.setArt({
-                    'thumb': thumb,
-                    'poster': poster
-                })
+                    # Bitmap aus den aktuellen Status-Werten neu aufbauen
+                    new_dead = availability.DeadBitmap.from_statuses(statuses)
+                    if new_dead != dead:
+                        log('{} of {} videos unavailable'.format(new_dead.count(), len(all_ids)))
+                        save_dead_bitmap(channel_id, new_dead)
+                    dead = new_dead
+                if dead is not None:
+                    rows = dead.filter(rows)
+                    video_ids = dead.filter(all_ids)
+                page_rows = rows[first:first + page_size] if page_size else rows
                 
-                youtube_url = 'plugin://plugin.video.youtube/play/?video_id={}'.format(video_id)
-                xbmcplugin.addDirectoryItem(handle, youtube_url, item, False)
-                
-                # Progress-Log alle 50 Videos
-                if fetch_metadata and idx % 50 == 0:
-                    log('Processed {} of {} videos ({} new from YouTube)'.format(
-                        idx, len(video_ids), new_metadata_count))
+                with TIMER.span('snapshot_save'):
+                    save_channel_snapshot(channel_id, video_ids, fetch_metadata, rows, since)
+            else:
+                # Kanal noch unvollständig: nur die sichtbare Seite aufbauen, kein Snapshot
+                statuses = []
+                with TIMER.span('rows'):
+                    page_rows = build_channel_rows(page_ids, fetch_metadata, first + 1, channel_id, statuses)
+                page_rows = availability.DeadBitmap.from_statuses(statuses).filter(page_rows)
             
-            # Speichere Cache wenn neue Daten geladen wurden
-            if fetch_metadata and new_metadata_count > 0:
-                log('Saving cache with {} new entries...'.format(new_metadata_count))
-                save_cache_to_disk()
+            if page_rows is not None:
+                with TIMER.span('items'):
+                    items += build_video_items(page_rows)
+            if page_size and first + page_size < len(video_ids):
+                next_item = xbmcgui.ListItem(label='[COLOR blue]Nächste Seite ({} / {})[/COLOR]'.format(
+                    page + 2, (len(video_ids) + page_size - 1) // page_size), offscreen=True)
+                items.append((get_url(action='browse', channel=channel_id, page=page + 1), next_item, True))
+            # Alle (übrigen) Einträge in einem Aufruf an Kodi übergeben
+            if items:
+                with TIMER.span('add_items'):
+                    xbmcplugin.addDirectoryItems(handle, items, len(items) if page_rows is not None else total_items)
         else:
             error = xbmcgui.ListItem(label='[COLOR red]Kanal nicht gefunden[/COLOR]')
             xbmcplugin.addDirectoryItem(handle, '', error, False)
@@ -325,32 +1409,79 @@ def browse_channel(handle, channel_id):
             xbmcplugin.addSortMethod(handle, xbmcplugin.SORT_METHOD_LABEL)
             xbmcplugin.addSortMethod(handle, xbmcplugin.SORT_METHOD_ARTIST)
         
-        xbmcplugin.endOfDirectory(handle, succeeded=True)
+        with TIMER.span('end_of_directory'):
+            xbmcplugin.endOfDirectory(handle, succeeded=True)
+        TIMER.mark('visible')
         log('=== BROWSE END ===')
         
+        # Liste ist angezeigt; Rest im Hintergrund laden bis der Benutzer weiternavigiert
+        if fetch_metadata and get_setting_bool('background_prefetch'):
+            with TIMER.span('prefetch'):
+                prefetch_in_background(is_cancelled)
+        
     except Exception as e:
         log('ERROR: {}'.format(str(e)))
         log(traceback.format_exc())
         xbmcplugin.endOfDirectory(handle, succeeded=False)
 
-def router(paramstring):
+def finish_timing(params):
+    """Schreibt die Zeitmessung des Aufrufs ins Log (und optional in TIMING_FILE)."""
+    if not TIMER.enabled:
+        return
+    try:
+        record = TIMER.record(action=params.get('action', 'channels'), channel=params.get('channel'),
+                              page=params.get('page'))
+        log('Timing: {} {}'.format(record['action'], timing.format_record(record)))
+        if get_setting_bool('timing_file'):
+            ensure_addon_data_folder()
+            timing.append_record(TIMING_FILE, record)
+    except Exception as e:
+        log('Error writing timing: {}'.format(str(e)))
+
+def router(argv):
+    global REQUEST, TIMER
+    
+    TIMER = timing.PhaseTimer(get_setting_bool('timing'), STARTED)
+    TIMER.add('startup', TIMER.clock() - STARTED)
+    params = {}
     try:
-        params = dict(parse_qsl(paramstring))
-        handle = int(sys.argv[1])
+        REQUEST = runtime.RequestContext(argv, claim_request_token())
+        params = REQUEST.params
+        handle = REQUEST.handle
         
         if not params:
             list_channels(handle)
         elif params.get('action') == 'browse':
-            browse_channel(handle, params['channel'])
+            browse_channel(handle, params['channel'], int(params.get('page', 0)))
+        elif params.get('action') == 'play':
+            start_play_session(playqueue.new_state(
+                playqueue.MODE_SEQUENTIAL, params['channel'], int(params.get('start', 0))))
+        elif params.get('action') == 'shuffle':
+            start_play_session(playqueue.new_state(
+                playqueue.MODE_SHUFFLE, params.get('channel', shuffle.SCOPE_ALL)))
+        elif params.get('action') == 'live':
+            start_live_channel(handle, params['channel'], params.get('session') == '1')
+        elif params.get('action') == 'durations':
+            enrich_durations()
+        elif params.get('action') == 'mix':
+            start_play_session(playqueue.new_state(playqueue.MODE_MIX, None))
+        elif params.get('action') == 'availability':
+            show_availability_report()
+        elif params.get('action') == 'library':
+            export_library()
+        elif params.get('action') == 'livetv':
+            update_live_tv(notify=True)
         else:
             xbmcplugin.endOfDirectory(handle, succeeded=False)
     except Exception as e:
         log('FATAL: {}'.format(str(e)))
         try:
-            xbmcplugin.endOfDirectory(int(sys.argv[1]), succeeded=False)
+            xbmcplugin.endOfDirectory(int(argv[1]), succeeded=False)
         except:
             pass
+    finally:
+        finish_timing(params)
 
 if __name__ == '__main__':
     log('MTV REWIND v1.6.0 - With Disk Cache')
-    router(sys.argv[2][1:])
+    router(sys.argv)
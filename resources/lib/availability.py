@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Nicht mehr verfuegbare Videos
+#
+# oEmbed antwortet fuer geloeschte Videos mit 404 und fuer private bzw.
+# gesperrte mit 401/403. Solche Videos bekommen einen eigenen Status im
+# Metadaten-Cache. Pro Kanal liegt zusaetzlich eine Bitmap (1 Bit pro Video,
+# gesetzt = nicht abspielbar), damit Listen und Wiedergabe-Sessions tote
+# Eintraege ohne Metadaten-Zugriff ueberspringen koennen. Bytes ohne
+# gesetztes Bit werden beim Filtern am Stueck uebernommen.
+
+import os
+import struct
+
+from resources.lib.metadata import STATUS_FALLBACK, STATUS_PRIVATE, STATUS_REMOVED, DEAD_STATUSES
+
+_HEADER = struct.Struct('<I')
+
+
+def classify_http_status(code):
+    """Status eines Videos anhand des HTTP-Fehlercodes der oEmbed-Anfrage."""
+    if code in (404, 410):
+        return STATUS_REMOVED
+    if code in (401, 403):
+        return STATUS_PRIVATE
+    # 429, 5xx usw.: voruebergehend
+    return STATUS_FALLBACK
+
+
+class DeadBitmap(object):
+    """Ein Bit pro Video eines Kanals; gesetzt = nicht abspielbar."""
+
+    def __init__(self, size, bits=None):
+        self.size = size
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def from_statuses(cls, statuses):
+        """Baut die Bitmap aus den Status-Werten der Videos (None = unbekannt)."""
+        statuses = list(statuses)
+        bitmap = cls(len(statuses))
+        for index, status in enumerate(statuses):
+            if status in DEAD_STATUSES:
+                bitmap.mark(index)
+        return bitmap
+
+    def mark(self, index):
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def clear(self, index):
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def is_dead(self, index):
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def count(self):
+        return sum(bin(byte).count('1') for byte in self.bits if byte)
+
+    def filter(self, items):
+        """Gibt nur die abspielbaren Eintraege zurueck."""
+        if not any(self.bits):
+            return list(items)
+        result = []
+        for byte_index, byte in enumerate(self.bits):
+            block = items[byte_index * 8:byte_index * 8 + 8]
+            if not byte:
+                result.extend(block)
+            else:
+                result.extend(item for bit, item in enumerate(block) if not byte >> bit & 1)
+        return result
+
+    def mask(self, items):
+        """Wie filter(), aber tote Eintraege werden durch None ersetzt (Indizes bleiben gleich)."""
+        if not any(self.bits):
+            return list(items)
+        result = list(items)
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        result[byte_index * 8 + bit] = None
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, DeadBitmap) and self.size == other.size and self.bits == other.bits
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _bitmap_path(folder, channel_id):
+    return os.path.join(folder, '{}.bin'.format(channel_id))
+
+def load_bitmap(folder, channel_id, size):
+    """Liest die Bitmap eines Kanals; None wenn sie fehlt oder nicht zur Kanalgroesse passt."""
+    path = _bitmap_path(folder, channel_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size or _HEADER.unpack_from(data)[0] != size:
+        return None
+    bits = data[_HEADER.size:]
+    if len(bits) != (size + 7) // 8:
+        return None
+    return DeadBitmap(size, bits)
+
+def save_bitmap(folder, channel_id, bitmap):
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    path = _bitmap_path(folder, channel_id)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(bitmap.size) + bytes(bitmap.bits))
+    os.replace(tmp_path, path)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kanaele als simuliertes Live-Programm
+#
+# Jeder Kanal laeuft in einer Endlosschleife seit BROADCAST_EPOCH. Aus den
+# Laengen der Videos wird einmal ein Array der Praefixsummen (Endzeiten)
+# gebildet; welches Video gerade "laeuft", ist dann eine Binaersuche ueber
+# die Zeit modulo der Gesamtlaenge.
+
+import bisect
+import time
+from itertools import accumulate
+
+# Beginn des Programms (2020-01-01 00:00 UTC), fuer alle Kanaele gleich
+BROADCAST_EPOCH = 1577836800
+
+# Angenommene Laenge eines Videos ohne bekannte Dauer (Sekunden)
+DEFAULT_DURATION = 240
+
+
+class Schedule(object):
+    """Sendeplan eines Kanals.
+
+    durations ist ein Mapping video_id -> Sekunden (oder None); fehlende
+    Dauern werden mit DEFAULT_DURATION angenommen. key beschreibt die
+    Eingaben, damit ein gespeicherter Plan als veraltet erkannt wird.
+    """
+
+    def __init__(self, video_ids, durations=None, key=None):
+        self.video_ids = video_ids
+        self.key = key
+        lengths = []
+        for video_id in video_ids:
+            duration = durations.get(video_id) if durations is not None else None
+            lengths.append(duration if duration and duration > 0 else DEFAULT_DURATION)
+        # ends[i] = Ende von Video i relativ zum Beginn einer Runde
+        self.ends = list(accumulate(lengths))
+        self.total = self.ends[-1] if self.ends else 0
+
+    def locate(self, timestamp=None):
+        """Gibt (index, offset in sekunden) des Videos zurueck, das zu timestamp laeuft."""
+        if not self.total:
+            raise ValueError('empty schedule')
+        if timestamp is None:
+            timestamp = time.time()
+        position = (int(timestamp) - BROADCAST_EPOCH) % self.total
+        index = bisect.bisect_right(self.ends, position)
+        start = self.ends[index - 1] if index else 0
+        return index, position - start
+
+    def slots(self, start, end):
+        """Liefert (index, beginn, ende) aller Videos, die zwischen start und end laufen (Unix-Zeit)."""
+        index, offset = self.locate(start)
+        slot_start = int(start) - offset
+        while slot_start < end:
+            slot_end = slot_start + self.ends[index] - (self.ends[index - 1] if index else 0)
+            yield index, slot_start, slot_end
+            slot_start = slot_end
+            index = (index + 1) % len(self.ends)
+
+    def __len__(self):
+        return len(self.video_ids)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kanal-Daten ohne vollstaendigen Import von playlists_data
+#
+# Im Speicherspar-Modus wird PLAYLISTS nicht importiert. Stattdessen wird
+# playlists_data.py zeilenweise gelesen und nur der angeforderte Kanal in den
+# Speicher geholt. Das Format der Datei ist fest: ein Kanal beginnt mit einer
+# Zeile '"name": [' und endet mit '],'.
+
+import os
+import re
+
+PLAYLISTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'playlists_data.py')
+
+_CHANNEL_START = re.compile(r'^\s*"([^"]+)":\s*\[\s*$')
+_CHANNEL_END = re.compile(r'^\s*\],?\s*$')
+_VIDEO_ID = re.compile(r'"([^"]+)"')
+
+
+def _iter_channel_lines(path=PLAYLISTS_FILE):
+    """Liefert (channel_id, zeile) fuer jede Datenzeile der Playlist-Datei."""
+    channel_id = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if channel_id is None:
+                match = _CHANNEL_START.match(line)
+                if match:
+                    channel_id = match.group(1)
+            elif _CHANNEL_END.match(line):
+                channel_id = None
+            else:
+                yield channel_id, line
+
+def read_channel(channel_id, path=PLAYLISTS_FILE):
+    """Liest die Video-IDs eines Kanals. Gibt None zurueck wenn es den Kanal nicht gibt."""
+    video_ids = None
+    for line_channel, line in _iter_channel_lines(path):
+        if line_channel == channel_id:
+            if video_ids is None:
+                video_ids = []
+            video_ids.extend(_VIDEO_ID.findall(line))
+        elif video_ids is not None:
+            break
+    return video_ids
+
+def read_channel_counts(path=PLAYLISTS_FILE):
+    """Zaehlt die Videos pro Kanal ohne die IDs zu behalten: {channel_id: anzahl}."""
+    counts = {}
+    for channel_id, line in _iter_channel_lines(path):
+        counts[channel_id] = counts.get(channel_id, 0) + line.count('"') // 2
+    return counts
+
+def iter_channels(path=PLAYLISTS_FILE):
+    """Liefert (channel_id, video_ids) fuer jeden Kanal, ohne alle Kanaele gleichzeitig zu halten."""
+    current = None
+    video_ids = []
+    for channel_id, line in _iter_channel_lines(path):
+        if channel_id != current:
+            if current is not None:
+                yield current, video_ids
+            current = channel_id
+            video_ids = []
+        video_ids.extend(_VIDEO_ID.findall(line))
+    if current is not None:
+        yield current, video_ids
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Videolaengen (eigene Anreicherungs-Stufe)
+#
+# oEmbed liefert keine Dauer. Die Laengen werden deshalb getrennt von Titel
+# und Kuenstler aus einer austauschbaren Quelle geholt (YouTube Data API oder
+# eine lokale JSON-Datei) und in einer eigenen Binaerdatei gespeichert
+# (records.py): pro Video ein Datensatz '<QH' (64-Bit-Schluessel, Sekunden).
+# Dauer 0 bedeutet "bei der Quelle nicht verfuegbar" und wird nicht erneut
+# angefragt. Ein abgebrochener Lauf setzt deshalb einfach beim naechsten
+# fehlenden Video fort.
+
+import json
+import queue
+import re
+import struct
+import threading
+import time
+import urllib.request
+from urllib.parse import urlencode
+
+from resources.lib.records import RecordStore
+
+# Hoechste speicherbare Dauer (laengere Videos werden gekappt)
+MAX_DURATION = 0xFFFF
+
+_ISO_DURATION = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def parse_iso_duration(text):
+    """Wandelt eine ISO-8601-Dauer wie 'PT3M52S' in Sekunden um (None wenn ungueltig)."""
+    match = _ISO_DURATION.match(text or '')
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(value or 0) for value in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+class DurationStore(RecordStore):
+    """Videolaengen in Sekunden; 0 = bei der Quelle nicht verfuegbar."""
+
+    record = struct.Struct('<QH')
+
+    def encode(self, seconds):
+        return min(max(int(seconds or 0), 0), MAX_DURATION)
+
+
+class YouTubeApiSource(object):
+    """Dauern ueber die YouTube Data API v3 (bis zu 50 IDs pro Anfrage)."""
+
+    URL = 'https://www.googleapis.com/youtube/v3/videos'
+    batch_size = 50
+
+    def __init__(self, api_key, timeout=10):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def fetch(self, video_ids):
+        url = '{}?{}'.format(self.URL, urlencode({
+            'part': 'contentDetails', 'id': ','.join(video_ids), 'key': self.api_key}))
+        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        results = dict((video_id, None) for video_id in video_ids)
+        for item in data.get('items', []):
+            results[item['id']] = parse_iso_duration(item.get('contentDetails', {}).get('duration'))
+        return results
+
+
+class JsonFileSource(object):
+    """Dauern aus einer lokalen JSON-Datei {video_id: sekunden} (z.B. zum Testen
+    oder fuer vorab erzeugte Listen)."""
+
+    batch_size = 200
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.durations = json.load(f)
+
+    def fetch(self, video_ids):
+        return dict((video_id, self.durations.get(video_id)) for video_id in video_ids)
+
+
+class RateLimiter(object):
+    """Hoechstens rate Anfragen pro Sekunde (thread-sicher)."""
+
+    def __init__(self, rate, clock=time.time, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = self.clock()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+def enrich(source, store, video_ids, on_batch=None, workers=2, rate=2.0, is_cancelled=None):
+    """Holt fehlende Dauern in Batches parallel und speichert jeden Batch sofort.
+
+    on_batch(fertig, gesamt) wird im aufrufenden Thread nach jedem Batch
+    aufgerufen. Fehlgeschlagene Batches werden nicht gespeichert und beim
+    naechsten Lauf erneut angefragt. Gibt (gespeichert, abgebrochen) zurueck.
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    missing = store.missing_ids(video_ids)
+    batches = queue.Queue()
+    for start in range(0, len(missing), source.batch_size):
+        batches.put(missing[start:start + source.batch_size])
+    results = queue.Queue()
+    stop = threading.Event()
+    limiter = RateLimiter(rate)
+
+    def worker():
+        while not stop.is_set():
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                return
+            limiter.wait()
+            try:
+                results.put((batch, source.fetch(batch)))
+            except Exception:
+                results.put((batch, None))
+
+    threads = [threading.Thread(target=worker) for _ in range(max(min(workers, batches.qsize()), 0))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    done = 0
+    stored = 0
+    cancelled = False
+    while any(thread.is_alive() for thread in threads) or not results.empty():
+        if is_cancelled():
+            cancelled = True
+            stop.set()
+            break
+        try:
+            batch, batch_results = results.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        done += len(batch)
+        if batch_results is not None:
+            stored += store.add(batch_results)
+        if on_batch is not None:
+            on_batch(done, len(missing))
+    return stored, cancelled
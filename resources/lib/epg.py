@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kanaele fuer Live-TV (M3U-Playlist und XMLTV-Programm)
+#
+# Fuer PVR IPTV Simple Client: Die M3U-Datei enthaelt pro Kanal die
+# Plugin-URL des Live-Modus, die XMLTV-Datei den simulierten Sendeplan
+# (broadcast.py) der naechsten Tage.
+#
+# Das Programm wird tageweise fortgeschrieben: Neue Tage werden vor dem
+# schliessenden </tv> angehaengt, statt die ganze Datei neu zu schreiben.
+# Neu geschrieben wird nur, wenn sich ein Sendeplan geaendert hat (neue
+# Videolaengen, nicht mehr verfuegbare Videos) oder wenn die Datei mehr als
+# KEEP_PAST_DAYS vergangene Tage enthaelt.
+
+import array
+import hashlib
+import json
+import os
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+DAY = 86400
+
+# Vergangene Tage, die im Programm bleiben duerfen, bevor es neu geschrieben wird
+KEEP_PAST_DAYS = 2
+
+# Sendungen pro Block, deren Videos vor dem Beschreiben gemeinsam vorgeladen werden
+PRELOAD_CHUNK = 500
+
+_FOOTER = b'</tv>\n'
+
+
+def tvg_id(channel_id):
+    return 'mtvrewind.{}'.format(channel_id)
+
+def timeline_key(schedule):
+    """Pruefsumme eines Sendeplans (aendert sich mit Reihenfolge oder Laengen)."""
+    return hashlib.blake2b(array.array('Q', schedule.ends).tobytes(), digest_size=8).hexdigest()
+
+def format_time(timestamp):
+    return time.strftime('%Y%m%d%H%M%S +0000', time.gmtime(timestamp))
+
+def write_m3u(path, channels):
+    """Schreibt die Playlist [(channel_id, name, url), ...]; nur wenn sie sich aendert.
+
+    Gibt True zurueck, wenn die Datei geschrieben wurde.
+    """
+    lines = ['#EXTM3U']
+    for channel_id, name, url in channels:
+        lines.append('#EXTINF:-1 tvg-id={} tvg-name={} group-title="MTV Rewind",{}'.format(
+            quoteattr(tvg_id(channel_id)), quoteattr(name), name))
+        lines.append(url)
+    content = '\n'.join(lines) + '\n'
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+class Guide(object):
+    """XMLTV-Datei unter path; der Stand (Zeitraum, Sendeplan-Schluessel) liegt in state_path."""
+
+    def __init__(self, path, state_path):
+        self.path = path
+        self.state_path = state_path
+        self.state = {}
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except ValueError:
+                pass
+
+    def _chunks(self, schedule, start, end, appending):
+        chunk = []
+        for index, slot_start, slot_end in schedule.slots(start, end):
+            if appending and slot_start < start:
+                # Lief schon am Ende des bisherigen Zeitraums und steht bereits in der Datei
+                continue
+            chunk.append((index, slot_start, slot_end))
+            if len(chunk) >= PRELOAD_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _programmes(self, channels, describe, start, end, appending, preload=None):
+        for channel_id, _, schedule in channels:
+            channel = quoteattr(tvg_id(channel_id))
+            for chunk in self._chunks(schedule, start, end, appending):
+                if preload is not None:
+                    preload([schedule.video_ids[index] for index, _, _ in chunk])
+                for index, slot_start, slot_end in chunk:
+                    title, desc, icon = describe(schedule.video_ids[index])
+                    yield ('<programme start="{}" stop="{}" channel={}>\n'
+                           '  <title>{}</title>\n  <desc>{}</desc>\n  <icon src={} />\n'
+                           '</programme>\n').format(format_time(slot_start), format_time(slot_end), channel,
+                                                    escape(title), escape(desc), quoteattr(icon))
+
+    def _can_append(self, keys, today):
+        if self.state.get('keys') != keys or self.state.get('path') != self.path:
+            return False
+        if self.state.get('start', 0) < today - KEEP_PAST_DAYS * DAY:
+            return False
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < len(_FOOTER):
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(-len(_FOOTER), os.SEEK_END)
+            return f.read() == _FOOTER
+
+    def update(self, channels, describe, days, now=None, preload=None):
+        """Bringt das Programm auf days Tage ab heute (UTC).
+
+        channels ist [(channel_id, name, schedule), ...], describe(video_id)
+        liefert (titel, beschreibung, bild-url). preload(video_ids) wird, falls
+        angegeben, vor jedem Block von PRELOAD_CHUNK Sendungen aufgerufen.
+        Gibt (neu geschrieben, angehaengte Tage) zurueck.
+        """
+        now = int(time.time() if now is None else now)
+        today = now - now % DAY
+        target = today + days * DAY
+        keys = dict((channel_id, timeline_key(schedule)) for channel_id, _, schedule in channels)
+
+        if self._can_append(keys, today):
+            start = self.state['until']
+            if start >= target:
+                return False, 0
+            with open(self.path, 'r+b') as f:
+                f.seek(-len(_FOOTER), os.SEEK_END)
+                f.truncate()
+                for chunk in self._programmes(channels, describe, start, target, True, preload):
+                    f.write(chunk.encode('utf-8'))
+                f.write(_FOOTER)
+            rewritten = False
+        else:
+            start = today
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="MTV Rewind">\n')
+                for channel_id, name, _ in channels:
+                    f.write('<channel id={}>\n  <display-name>{}</display-name>\n</channel>\n'.format(
+                        quoteattr(tvg_id(channel_id)), escape(name)).encode('utf-8'))
+                for chunk in self._programmes(channels, describe, start, target, False, preload):
+                    f.write(chunk.encode('utf-8'))
+                f.write(_FOOTER)
+            os.replace(tmp_path, self.path)
+            self.state = {'path': self.path, 'keys': keys, 'start': today}
+            rewritten = True
+
+        self.state['until'] = target
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+        return rewritten, (target - start) // DAY
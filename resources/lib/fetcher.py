@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Paralleles Laden von Metadaten
+#
+# Die Worker-Threads holen nur Daten; Ergebnisse werden im aufrufenden Thread
+# verarbeitet, damit der Cache nie von mehreren Threads gleichzeitig
+# geschrieben wird. Der aufrufende Thread prueft regelmaessig, ob die Arbeit
+# abgebrochen werden soll (Kodi beendet sich, Benutzer hat weiternavigiert).
+#
+# Offene Anfragen liegen in einer Prioritaets-Warteschlange: zuerst die
+# sichtbaren Videos, dann die angrenzenden, dann der Rest des Kanals und
+# zuletzt andere Kanaele.
+
+import heapq
+import queue
+import threading
+import time
+
+# Wie oft (Sekunden) die Abbruch-Pruefung hoechstens aufgerufen wird
+CANCEL_POLL_INTERVAL = 0.2
+
+# Prioritaeten (kleiner = frueher)
+PRIORITY_VISIBLE = 0
+PRIORITY_NEAR = 1
+PRIORITY_CHANNEL = 2
+PRIORITY_OTHER = 3
+
+
+class FetchQueue(object):
+    """Thread-sichere Prioritaets-Warteschlange fuer Video-IDs.
+
+    Jede ID ist hoechstens einmal aktiv eingereiht. Eine neue Prioritaet
+    erzeugt einen neuen Heap-Eintrag; veraltete Eintraege werden beim
+    Entnehmen uebersprungen.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._priority = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def push(self, video_ids, priority):
+        """Reiht IDs ein. Bereits eingereihte IDs werden nur hochgestuft."""
+        with self._lock:
+            for video_id in video_ids:
+                current = self._priority.get(video_id)
+                if current is not None and current <= priority:
+                    continue
+                self._priority[video_id] = priority
+                heapq.heappush(self._heap, (priority, self._seq, video_id))
+                self._seq += 1
+
+    def demote_all(self, priority):
+        """Stuft alle offenen IDs auf mindestens diese Prioritaet herab (z.B. bei Seitenwechsel)."""
+        with self._lock:
+            self._heap = [(max(entry_priority, priority), seq, video_id)
+                          for entry_priority, seq, video_id in self._heap
+                          if self._priority.get(video_id) == entry_priority]
+            heapq.heapify(self._heap)
+            for _, _, video_id in self._heap:
+                self._priority[video_id] = max(self._priority[video_id], priority)
+
+    def pop(self, max_priority=None):
+        """Entnimmt die wichtigste ID (oder None, wenn keine bis max_priority offen ist)."""
+        with self._lock:
+            while self._heap:
+                priority, _, video_id = self._heap[0]
+                if self._priority.get(video_id) != priority:
+                    heapq.heappop(self._heap)
+                    continue
+                if max_priority is not None and priority > max_priority:
+                    return None
+                heapq.heappop(self._heap)
+                del self._priority[video_id]
+                return video_id
+            return None
+
+    def count(self, max_priority=None):
+        """Anzahl offener IDs bis einschliesslich max_priority."""
+        with self._lock:
+            if max_priority is None:
+                return len(self._priority)
+            return sum(1 for priority in self._priority.values() if priority <= max_priority)
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return video_id in self._priority
+
+    def __len__(self):
+        with self._lock:
+            return len(self._priority)
+
+
+class MetadataFetcher(object):
+    """Holt Metadaten fuer eine Liste von IDs mit einem kleinen Thread-Pool."""
+
+    def __init__(self, fetch_func, workers=4, is_cancelled=None):
+        self.fetch_func = fetch_func
+        self.workers = max(workers, 1)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.cancelled = False
+
+    def _worker(self, pending, max_priority, results, stop):
+        while not stop.is_set():
+            video_id = pending.pop(max_priority)
+            if video_id is None:
+                return
+            try:
+                info = self.fetch_func(video_id)
+            except Exception:
+                info = None
+            results.put((video_id, info))
+
+    def run(self, pending, on_result, max_priority=None):
+        """Arbeitet die FetchQueue bis max_priority ab (None = alles) und ruft
+        on_result(video_id, info) im aufrufenden Thread auf.
+
+        Prioritaeten, die waehrenddessen geaendert werden, wirken sofort auf
+        die naechste Anfrage. Gibt die Anzahl verarbeiteter Ergebnisse zurueck.
+        Bei Abbruch werden keine neuen Anfragen mehr gestartet; laufende
+        Anfragen werden nicht mehr abgewartet und ihre Ergebnisse verworfen.
+        """
+        results = queue.Queue()
+        stop = threading.Event()
+
+        # Daemon-Threads, damit haengende Anfragen das Beenden nicht blockieren
+        threads = [threading.Thread(target=self._worker, args=(pending, max_priority, results, stop))
+                   for _ in range(min(self.workers, max(pending.count(max_priority), 1)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        done = 0
+        next_poll = 0
+        while True:
+            now = time.time()
+            if now >= next_poll:
+                next_poll = now + CANCEL_POLL_INTERVAL
+                if self.is_cancelled():
+                    self.cancelled = True
+                    stop.set()
+                    break
+            try:
+                video_id, info = results.get(timeout=CANCEL_POLL_INTERVAL)
+            except queue.Empty:
+                if results.empty() and not any(thread.is_alive() for thread in threads):
+                    break
+                continue
+            on_result(video_id, info)
+            done += 1
+        return done
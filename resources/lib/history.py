@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Zuletzt gespielte Videos (No-Repeat-Fenster)
+#
+# Die letzten N gezogenen Videos liegen in einem Ringpuffer; ein Dict mit
+# Zaehlern beantwortet "kam das Video gerade erst?" in O(1), ohne die
+# Historie zu durchsuchen. Gespeichert werden nur die 64-Bit-Schluessel der
+# IDs (8 Byte pro Eintrag, aelteste zuerst). IDs, die sich nicht als
+# Schluessel darstellen lassen, werden nicht erfasst.
+#
+# Optional zaehlt die Historie auch Gruppen (z.B. Song-IDs, siehe songs.py),
+# damit ein anderer Upload desselben Songs ebenfalls als "kuerzlich" gilt.
+# Die Gruppe wird beim Eintragen bestimmt und mit dem Schluessel im Ring
+# abgelegt; beim Verdraengen wird genau diese Gruppe wieder abgezogen, auch
+# wenn group_of inzwischen etwas anderes liefert.
+
+import array
+import os
+
+from resources.lib.metadata_index import id_key
+
+
+def _count(counts, key, delta):
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        del counts[key]
+
+
+class RecentHistory(object):
+    """Ringpuffer der letzten capacity Videos mit O(1)-Abfrage.
+
+    group_of(key) liefert optional die Gruppe eines Schluessels (oder None).
+    """
+
+    def __init__(self, capacity, keys=(), group_of=None):
+        self.capacity = max(capacity, 0)
+        # (schluessel, gruppe beim eintragen)
+        self.ring = []
+        self.next_slot = 0
+        self.counts = {}
+        self.group_of = group_of
+        self.group_counts = {}
+        for key in keys:
+            self._add_key(key)
+
+    def _add_key(self, key):
+        if not self.capacity:
+            return
+        group = self.group_of(key) if self.group_of is not None else None
+        if len(self.ring) < self.capacity:
+            self.ring.append((key, group))
+        else:
+            old, old_group = self.ring[self.next_slot]
+            _count(self.counts, old, -1)
+            if old_group is not None:
+                _count(self.group_counts, old_group, -1)
+            self.ring[self.next_slot] = (key, group)
+            self.next_slot = (self.next_slot + 1) % self.capacity
+        _count(self.counts, key, 1)
+        if group is not None:
+            _count(self.group_counts, group, 1)
+
+    def add(self, video_id):
+        key = id_key(video_id)
+        if key is not None:
+            self._add_key(key)
+
+    def keys(self):
+        """Schluessel in Reihenfolge, aelteste zuerst."""
+        return [key for key, _ in self.ring[self.next_slot:] + self.ring[:self.next_slot]]
+
+    def __contains__(self, video_id):
+        key = id_key(video_id)
+        if key in self.counts:
+            return True
+        group = self.group_of(key) if self.group_of is not None and key is not None else None
+        return group is not None and group in self.group_counts
+
+    def __len__(self):
+        return len(self.ring)
+
+
+def load_keys(path):
+    """Gespeicherte Schluessel, aelteste zuerst (leer wenn die Datei fehlt)."""
+    keys = array.array('Q')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        keys.frombytes(data[:len(data) - len(data) % keys.itemsize])
+    return keys
+
+def load_history(path, capacity, group_of=None):
+    """Liest die gespeicherte Historie; bei kleinerer capacity bleiben die neuesten Eintraege."""
+    keys = load_keys(path)
+    return RecentHistory(capacity, keys[max(len(keys) - capacity, 0):], group_of)
+
+def save_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        array.array('Q', history.keys()).tofile(f)
+    os.replace(tmp_path, path)
+
+def draw_fresh(draw, count, history, max_rejects):
+    """Zieht bis zu count IDs ueber draw() (None = erschoepft) und verwirft
+    dabei Videos aus der Historie.
+
+    Nach max_rejects Verwerfungen werden auch kuerzlich gespielte Videos
+    genommen, damit kleine Kanaele nicht haengen bleiben. Gezogene IDs
+    werden in die Historie eingetragen.
+    """
+    video_ids = []
+    rejects = 0
+    while len(video_ids) < count:
+        video_id = draw()
+        if video_id is None:
+            break
+        if video_id in history and rejects < max_rejects:
+            rejects += 1
+            continue
+        history.add(video_id)
+        video_ids.append(video_id)
+    return video_ids
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Export als Kodi-Bibliothek (.strm + .nfo)
+#
+# Pro Video entsteht eine .strm-Datei mit der Plugin-URL und eine .nfo-Datei
+# (musicvideo) mit den Metadaten, sortiert nach Kanal oder Kuenstler. Kodi
+# kann die Videos dann als Musikvideo-Bibliothek durchsuchen und sortieren.
+#
+# Der Export ist inkrementell: library.json im Profil merkt sich pro Video
+# Pfad und Pruefsumme der geschriebenen Dateien. Ein erneuter Lauf schreibt
+# nur neue oder geaenderte Videos und loescht Dateien von Videos, die nicht
+# mehr exportiert werden.
+
+import hashlib
+import json
+import os
+import re
+from xml.sax.saxutils import escape
+
+LAYOUT_CHANNEL = 0
+LAYOUT_ARTIST = 1
+
+# Hoechstlaenge eines Datei- bzw. Ordnernamens (ohne Endung)
+MAX_NAME_LENGTH = 100
+
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+NFO_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<musicvideo>
+    <title>{title}</title>
+    <artist>{artist}</artist>
+    <album>{album}</album>
+    <plot>{plot}</plot>
+    <thumb aspect="thumb">{thumb}</thumb>
+    <uniqueid type="youtube" default="true">{video_id}</uniqueid>
+{tags}</musicvideo>
+'''
+
+
+def safe_name(name):
+    """Datei- bzw. Ordnername ohne unzulaessige Zeichen."""
+    name = _UNSAFE_CHARS.sub('', name).strip().strip('.')
+    return name[:MAX_NAME_LENGTH].strip() or '_'
+
+def build_nfo(info, album, tags):
+    return NFO_TEMPLATE.format(
+        title=escape(info.title), artist=escape(info.artist), album=escape(album),
+        plot=escape(info.plot), thumb=escape(info.poster), video_id=escape(info.video_id),
+        tags=''.join('    <tag>{}</tag>\n'.format(escape(tag)) for tag in tags))
+
+def build_entry(info, channel_name, other_names, layout, play_url):
+    """Gibt (video_id, relativer pfad ohne endung, strm, nfo) fuer ein Video zurueck."""
+    if layout == LAYOUT_ARTIST:
+        folder = safe_name(info.artist)
+        name = safe_name('{} [{}]'.format(info.title, info.video_id))
+    else:
+        folder = safe_name(channel_name)
+        name = safe_name('{} - {} [{}]'.format(info.artist, info.title, info.video_id))
+    nfo = build_nfo(info, channel_name, [channel_name] + list(other_names))
+    return info.video_id, os.path.join(folder, name), play_url + '\n', nfo
+
+
+def _digest(strm, nfo):
+    return hashlib.blake2b((strm + '\0' + nfo).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class LibraryExport(object):
+    """Schreibt Eintraege unter root und merkt sich den Stand in state_path."""
+
+    def __init__(self, root, state_path):
+        self.root = root
+        self.state_path = state_path
+        self.state = {}
+        # Ordner, aus denen geloescht wurde (leere werden am Ende entfernt)
+        self.touched_folders = set()
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('root') == root:
+                    self.state = data.get('files', {})
+            except ValueError:
+                pass
+
+    def _write(self, path, content):
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _remove(self, base):
+        for ext in ('.strm', '.nfo'):
+            path = os.path.join(self.root, base + ext)
+            if os.path.exists(path):
+                os.remove(path)
+        self.touched_folders.add(os.path.dirname(os.path.join(self.root, base)))
+
+    def _remove_empty_folders(self):
+        for folder in self.touched_folders:
+            if folder != self.root and os.path.isdir(folder) and not os.listdir(folder):
+                os.rmdir(folder)
+        self.touched_folders.clear()
+
+    def sync(self, entries, is_cancelled=None, on_progress=None):
+        """Schreibt geaenderte Eintraege sofort und loescht am Ende nicht mehr
+        exportierte Videos (nur wenn der Lauf nicht abgebrochen wurde).
+
+        Gibt (geschrieben, unveraendert, geloescht, abgebrochen) zurueck.
+        """
+        written = unchanged = deleted = 0
+        cancelled = False
+        seen = set()
+        try:
+            for done, (video_id, base, strm, nfo) in enumerate(entries, 1):
+                if is_cancelled is not None and is_cancelled():
+                    cancelled = True
+                    break
+                seen.add(video_id)
+                digest = _digest(strm, nfo)
+                old = self.state.get(video_id)
+                if (old is not None and old[0] == base and old[1] == digest
+                        and os.path.exists(os.path.join(self.root, base + '.strm'))):
+                    unchanged += 1
+                else:
+                    if old is not None and old[0] != base:
+                        self._remove(old[0])
+                    self._write(os.path.join(self.root, base + '.strm'), strm)
+                    self._write(os.path.join(self.root, base + '.nfo'), nfo)
+                    self.state[video_id] = [base, digest]
+                    written += 1
+                if on_progress is not None:
+                    on_progress(done)
+            if not cancelled:
+                for video_id in [video_id for video_id in self.state if video_id not in seen]:
+                    self._remove(self.state.pop(video_id)[0])
+                    deleted += 1
+        finally:
+            self._remove_empty_folders()
+            self.save()
+        return written, unchanged, deleted, cancelled
+
+    def save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'root': self.root, 'files': self.state}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.state_path)
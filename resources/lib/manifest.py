@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Katalog-Manifest (Duplikate ueber Kanaele hinweg)
+#
+# Viele Videos stehen in mehreren Kanaelen. Das Manifest wird einmal aus
+# playlists_data.py erzeugt und enthaelt die Video-Anzahl pro Kanal, die
+# Zahl eindeutiger Videos und fuer jedes mehrfach vorkommende Video eine
+# Bitmaske der Kanaele. Videos, die nur in einem Kanal stehen, tauchen im
+# Manifest nicht auf; das haelt die Datei klein (~2.000 Eintraege).
+#
+# Der Schluessel ist der SHA-1 der Playlist-Datei; aendert sie sich, wird
+# das Manifest neu erzeugt.
+#
+# Erzeugen:  python -m resources.lib.manifest <manifest.json>
+
+import hashlib
+import json
+import os
+import sys
+
+from resources.lib import catalog
+
+
+def source_key(path=catalog.PLAYLISTS_FILE):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class CatalogManifest(object):
+    """Kanal-Zugehoerigkeit mehrfach vorkommender Videos und eindeutige Zaehlungen."""
+
+    def __init__(self, key, channel_ids, counts, exclusive, unique, shared):
+        self.key = key
+        self.channel_ids = channel_ids
+        self.counts = counts
+        self.exclusive = exclusive
+        self.unique = unique
+        self.shared = shared
+        self._bits = dict((channel_id, 1 << idx) for idx, channel_id in enumerate(channel_ids))
+
+    @classmethod
+    def build(cls, channels, key=None):
+        """Erzeugt das Manifest aus (channel_id, video_ids)-Paaren."""
+        channel_ids = []
+        counts = {}
+        masks = {}
+        for channel_id, video_ids in channels:
+            bit = 1 << len(channel_ids)
+            channel_ids.append(channel_id)
+            counts[channel_id] = len(video_ids)
+            for video_id in video_ids:
+                masks[video_id] = masks.get(video_id, 0) | bit
+
+        exclusive = dict((channel_id, 0) for channel_id in channel_ids)
+        shared = {}
+        for video_id, mask in masks.items():
+            if mask & (mask - 1):
+                shared[video_id] = mask
+            else:
+                exclusive[channel_ids[mask.bit_length() - 1]] += 1
+        return cls(key, channel_ids, counts, exclusive, len(masks), shared)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def channels_of(self, video_id):
+        """Kanaele eines mehrfach vorkommenden Videos (leer bei nur einem Kanal)."""
+        mask = self.shared.get(video_id, 0)
+        return [channel_id for channel_id in self.channel_ids if mask & self._bits[channel_id]]
+
+    def also_in(self, video_id, channel_id=None):
+        """Andere Kanaele, in denen das Video ebenfalls steht."""
+        return [other for other in self.channels_of(video_id) if other != channel_id]
+
+    def is_primary(self, video_id, channel_id):
+        """True, wenn channel_id der erste Kanal des Videos ist. Wer alle Kanaele
+        durchlaeuft und nur primaere Eintraege nimmt, sieht jedes Video einmal."""
+        mask = self.shared.get(video_id)
+        return mask is None or mask & -mask == self._bits.get(channel_id)
+
+    def to_dict(self):
+        return {'key': self.key, 'channels': self.channel_ids, 'counts': self.counts,
+                'exclusive': self.exclusive, 'unique': self.unique, 'shared': self.shared}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['key'], data['channels'], data['counts'], data['exclusive'],
+                   data['unique'], data['shared'])
+
+
+def load_manifest(path, key):
+    """Liest ein Manifest; None wenn es fehlt oder nicht zu key passt."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('key') != key:
+        return None
+    return CatalogManifest.from_dict(data)
+
+def save_manifest(path, manifest):
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest.to_dict(), f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m resources.lib.manifest <manifest.json>')
+        sys.exit(1)
+    built = CatalogManifest.build(catalog.iter_channels(), source_key())
+    save_manifest(sys.argv[1], built)
+    print('{} videos, {} unique, {} in several channels'.format(
+        built.total, built.unique, len(built.shared)))
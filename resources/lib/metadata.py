@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kompakte Video-Metadaten
+#
+# Ein Cache-Eintrag speichert nur Kuenstler, Titel, Original-Titel und Status.
+# Thumbnail, Poster und Plot werden bei Bedarf aus Video-ID und Titel abgeleitet.
+# Kuenstlernamen werden ueber eine Kuenstler-Tabelle dictionary-encodiert;
+# im Speicher teilt jeder Cache seine Namen ueber eine eigene Tabelle.
+
+import sys
+
+THUMB_URL = 'https://i.ytimg.com/vi/{}/mqdefault.jpg'
+POSTER_URL = 'https://i.ytimg.com/vi/{}/hqdefault.jpg'
+
+# Status eines Eintrags
+STATUS_OK = 0
+STATUS_FALLBACK = 1      # Laden fehlgeschlagen (voruebergehend, z.B. Netzwerk)
+STATUS_REMOVED = 2       # Video geloescht (oEmbed 404)
+STATUS_PRIVATE = 3       # Video privat bzw. gesperrt (oEmbed 401/403)
+STATUS_UNPLAYABLE = 4    # Wiedergabe fehlgeschlagen, obwohl oEmbed das Video kennt
+
+# Videos mit diesem Status lassen sich nicht abspielen
+DEAD_STATUSES = (STATUS_REMOVED, STATUS_PRIVATE, STATUS_UNPLAYABLE)
+
+# Version des Cache-Formats auf der Festplatte (alte Caches haben keine Version)
+CACHE_FORMAT_VERSION = 3
+
+
+def thumb_url(video_id):
+    return THUMB_URL.format(video_id)
+
+def poster_url(video_id):
+    return POSTER_URL.format(video_id)
+
+
+class ArtistTable(object):
+    """Kuenstler-Tabelle: jeder Name wird einmal gespeichert und per Index referenziert."""
+    __slots__ = ('names', 'ids')
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Gibt den Index des Kuenstlers zurueck und legt ihn bei Bedarf an."""
+        artist_id = self.ids.get(name)
+        if artist_id is None:
+            artist_id = len(self.names)
+            self.names.append(sys.intern(name))
+            self.ids[self.names[artist_id]] = artist_id
+        return artist_id
+
+    def intern(self, name):
+        """Gibt die gemeinsame Instanz des Kuenstlernamens zurueck."""
+        return self.names[self.add(name)]
+
+    def name(self, artist_id):
+        return self.names[artist_id]
+
+    def __len__(self):
+        return len(self.names)
+
+
+
+class VideoInfo(object):
+    """Metadaten eines Videos ohne ableitbare Felder."""
+    __slots__ = ('video_id', 'artist', 'title', 'full_title', 'status')
+
+    def __init__(self, video_id, artist, title, full_title, status=STATUS_OK):
+        self.video_id = video_id
+        self.artist = artist
+        self.title = title
+        self.full_title = full_title
+        self.status = status
+
+    @property
+    def thumb(self):
+        return thumb_url(self.video_id)
+
+    @property
+    def poster(self):
+        return poster_url(self.video_id)
+
+    @property
+    def plot(self):
+        if self.status != STATUS_OK:
+            return 'YouTube Video ID: {}'.format(self.video_id)
+        return '{} - {}'.format(self.artist, self.title)
+
+    def to_row(self, artists):
+        """Gibt den Eintrag als kompakte Liste fuer die JSON-Datei zurueck."""
+        return [artists.add(self.artist), self.title, self.full_title, self.status]
+
+    @classmethod
+    def from_row(cls, video_id, row, artist_names=None):
+        artist = row[0]
+        if artist_names is not None:
+            artist = artist_names[artist]
+        return cls(video_id, artist, row[1], row[2], row[3])
+
+    @classmethod
+    def from_legacy(cls, video_id, entry):
+        """Migriert einen alten Dict-Eintrag mit thumb/poster/plot."""
+        if entry.get('plot', '').startswith('YouTube Video ID:'):
+            status = STATUS_FALLBACK
+        else:
+            status = STATUS_OK
+        return cls(video_id,
+                   entry.get('artist', 'Unknown Artist'),
+                   entry.get('title', ''),
+                   entry.get('full_title', ''),
+                   status)
+
+    def __repr__(self):
+        return 'VideoInfo({!r}, {!r}, {!r})'.format(self.video_id, self.artist, self.title)
+
+
+def fallback_info(video_id, status=STATUS_FALLBACK):
+    """Ersatz-Eintrag wenn keine Metadaten geladen werden konnten."""
+    return VideoInfo(video_id, 'Unknown Artist', 'Video {}'.format(video_id[:8]),
+                     video_id, status)
+
+def decode_cache(data, artists=None):
+    """Wandelt den Inhalt einer Cache-Datei in {video_id: VideoInfo} um.
+
+    Alte Caches (ein Dict pro Video mit thumb/poster/plot) werden dabei
+    transparent migriert. Mit artists werden die Kuenstlernamen in diese
+    Tabelle eingetragen, damit gleiche Namen nur einmal im Speicher liegen.
+    """
+    if 'version' not in data:
+        entries = dict((video_id, VideoInfo.from_legacy(video_id, entry))
+                       for video_id, entry in data.items())
+    else:
+        # Version 2 speichert den Kuenstlernamen noch direkt in der Zeile
+        artist_names = data.get('artists') if data['version'] >= 3 else None
+        entries = dict((video_id, VideoInfo.from_row(video_id, row, artist_names))
+                       for video_id, row in data.get('videos', {}).items())
+    if artists is not None:
+        for info in entries.values():
+            info.artist = artists.intern(info.artist)
+    return entries
+
+def encode_cache(cache):
+    """Wandelt {video_id: VideoInfo} in das kompakte Dateiformat um."""
+    artists = ArtistTable()
+    videos = dict((video_id, info.to_row(artists)) for video_id, info in cache.items())
+    return {
+        'version': CACHE_FORMAT_VERSION,
+        'artists': artists.names,
+        'videos': videos
+    }
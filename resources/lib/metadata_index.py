@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Vorgefertigter Metadaten-Index (Binaerdatei, per mmap gelesen)
+#
+# Aufbau der Datei (little endian):
+#   Header   '<4sHHII'  Magic, Version, reserviert, Anzahl Videos, Anzahl Kuenstler
+#   Keys     n x '<Q'   sortierte 64-Bit-Schluessel der Video-IDs
+#   Zeilen   n x '<IIHHB' Kuenstler-Index, Heap-Offset, Laenge Titel,
+#                       Laenge Original-Titel, Status
+#   Kuenstler (a + 1) x '<I' Heap-Offsets der Kuenstlernamen
+#   Heap     UTF-8 Kuenstlernamen, danach Titel und Original-Titel je Video
+#
+# Beim Start wird nichts geparst; eine Abfrage ist eine Binaersuche ueber die
+# Keys und beruehrt nur wenige Seiten der Datei. Die Seiten liegen im
+# Page-Cache des Systems und werden zwischen Aufrufen geteilt.
+#
+# Erzeugen:  python -m resources.lib.metadata_index <cache.json|shard-ordner> <index.bin>
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+
+from resources.lib.metadata import ArtistTable, VideoInfo, decode_cache
+from resources.lib.metadata_store import ID_ALPHABET
+
+MAGIC = b'MTVI'
+INDEX_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHII')
+_KEY = struct.Struct('<Q')
+_ROW = struct.Struct('<IIHHB')
+_OFFSET = struct.Struct('<I')
+
+_CHAR_VALUE = dict((char, idx) for idx, char in enumerate(ID_ALPHABET))
+
+
+def id_key(video_id):
+    """Wandelt eine 11-stellige YouTube-ID in einen 64-Bit-Schluessel um.
+
+    Die ersten zehn Zeichen tragen je 6 Bit, das letzte Zeichen nur 4 Bit.
+    Gibt None zurueck wenn die ID nicht diesem Format entspricht.
+    """
+    if len(video_id) != 11:
+        return None
+    try:
+        value = 0
+        for char in video_id[:10]:
+            value = (value << 6) | _CHAR_VALUE[char]
+        last = _CHAR_VALUE[video_id[10]]
+    except KeyError:
+        return None
+    if last & 3:
+        return None
+    return (value << 4) | (last >> 2)
+
+def key_to_id(key):
+    """Umkehrung von id_key()."""
+    chars = [ID_ALPHABET[(key & 15) << 2]]
+    key >>= 4
+    for _ in range(10):
+        chars.append(ID_ALPHABET[key & 63])
+        key >>= 6
+    return ''.join(reversed(chars))
+
+
+def build_index(entries, path):
+    """Schreibt {video_id: VideoInfo} als Index-Datei. Gibt die Anzahl der Eintraege zurueck."""
+    keyed = []
+    for video_id, info in entries.items():
+        key = id_key(video_id)
+        if key is not None:
+            keyed.append((key, info))
+    keyed.sort(key=lambda item: item[0])
+
+    artists = ArtistTable()
+    for _, info in keyed:
+        artists.add(info.artist)
+
+    artist_blobs = [name.encode('utf-8') for name in artists.names]
+    heap_offset = sum(len(blob) for blob in artist_blobs)
+
+    rows = []
+    strings = []
+    for _, info in keyed:
+        title = info.title.encode('utf-8')[:0xFFFF]
+        full_title = info.full_title.encode('utf-8')[:0xFFFF]
+        rows.append(_ROW.pack(artists.add(info.artist), heap_offset,
+                              len(title), len(full_title), info.status))
+        strings.append(title)
+        strings.append(full_title)
+        heap_offset += len(title) + len(full_title)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, INDEX_VERSION, 0, len(keyed), len(artist_blobs)))
+        for key, _ in keyed:
+            f.write(_KEY.pack(key))
+        f.write(b''.join(rows))
+        offset = 0
+        for blob in artist_blobs:
+            f.write(_OFFSET.pack(offset))
+            offset += len(blob)
+        f.write(_OFFSET.pack(offset))
+        f.write(b''.join(artist_blobs))
+        f.write(b''.join(strings))
+    os.replace(tmp_path, path)
+    return len(keyed)
+
+
+class _KeyView(object):
+    """Sequenz-Sicht auf die Key-Tabelle, damit bisect direkt auf der Datei sucht."""
+    __slots__ = ('_map', '_start', '_count')
+
+    def __init__(self, data, start, count):
+        self._map = data
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        return _KEY.unpack_from(self._map, self._start + idx * _KEY.size)[0]
+
+
+class MetadataIndex(object):
+    """Nur-lesender Zugriff auf eine Index-Datei: {video_id: VideoInfo}."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, _, count, artist_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError('Unsupported metadata index: {}'.format(path))
+
+        self._count = count
+        self._keys = _KeyView(self._map, _HEADER.size, count)
+        self._rows_at = _HEADER.size + count * _KEY.size
+        self._artists_at = self._rows_at + count * _ROW.size
+        self._heap_at = self._artists_at + (artist_count + 1) * _OFFSET.size
+        self._artist_names = {}
+
+    def _artist(self, artist_ref):
+        name = self._artist_names.get(artist_ref)
+        if name is None:
+            pos = self._artists_at + artist_ref * _OFFSET.size
+            start = _OFFSET.unpack_from(self._map, pos)[0]
+            end = _OFFSET.unpack_from(self._map, pos + _OFFSET.size)[0]
+            name = self._map[self._heap_at + start:self._heap_at + end].decode('utf-8', 'ignore')
+            self._artist_names[artist_ref] = name
+        return name
+
+    def _find(self, video_id):
+        key = id_key(video_id)
+        if key is None:
+            return -1
+        idx = bisect.bisect_left(self._keys, key)
+        if idx < self._count and self._keys[idx] == key:
+            return idx
+        return -1
+
+    def get(self, video_id, default=None):
+        idx = self._find(video_id)
+        if idx < 0:
+            return default
+
+        artist_ref, offset, title_len, full_len, status = _ROW.unpack_from(
+            self._map, self._rows_at + idx * _ROW.size)
+        start = self._heap_at + offset
+        title = self._map[start:start + title_len].decode('utf-8', 'ignore')
+        start += title_len
+        full_title = self._map[start:start + full_len].decode('utf-8', 'ignore')
+        return VideoInfo(video_id, self._artist(artist_ref), title, full_title, status)
+
+    def __contains__(self, video_id):
+        return self._find(video_id) >= 0
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _load_source(path):
+    """Liest einen JSON-Cache oder einen Shard-Ordner in {video_id: VideoInfo}."""
+    if os.path.isdir(path):
+        entries = {}
+        for name in sorted(os.listdir(path)):
+            # Nur die Shards; versions.json, changes.log usw. gehoeren nicht dazu
+            if name.startswith('shard_') and name.endswith('.json'):
+                with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+                    entries.update(decode_cache(json.load(f)))
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        return decode_cache(json.load(f))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python -m resources.lib.metadata_index <cache.json|shard-folder> <index.bin>')
+        sys.exit(1)
+    written = build_index(_load_source(sys.argv[1]), sys.argv[2])
+    print('Wrote {} entries to {}'.format(written, sys.argv[2]))
@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Metadaten-Cache in Shards
+#
+# Der Cache wird nach dem ersten Zeichen der Video-ID auf 64 Dateien verteilt.
+# Ein Shard wird erst geladen wenn eine seiner IDs gebraucht wird, beim
+# Speichern werden nur geaenderte Shards neu geschrieben; hat ein anderer
+# Prozess (Dienst bzw. Plugin) einen Shard inzwischen geschrieben, werden nur
+# die eigenen Aenderungen in dessen Stand uebernommen. Optional dient ein
+# nur-lesender Index (siehe metadata_index) als Rueckfall fuer fehlende IDs.
+#
+# Jedes Speichern haengt die geaenderten IDs an changes.log an. Wer sich eine
+# Position im Protokoll merkt (change_position), erfaehrt spaeter mit
+# changed_since, welche IDs seitdem geaendert wurden - z.B. ob eine
+# gespeicherte Kanal-Liste noch stimmt. Wird das Protokoll zu gross, beginnt
+# es mit einer neuen Generation; aeltere Positionen gelten dann als unbekannt.
+#
+# BoundedCache ist die Variante fuer Geraete mit wenig RAM: statt ganzer Shards
+# haelt sie nur einzelne Eintraege in einem LRU mit fester Obergrenze.
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from resources.lib.metadata import ArtistTable, decode_cache, encode_cache
+
+# YouTube-IDs bestehen aus dem base64url-Alphabet
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+SHARD_COUNT = len(ID_ALPHABET)
+
+_SHARD_INDEX = dict((char, idx) for idx, char in enumerate(ID_ALPHABET))
+
+# Ab dieser Groesse beginnt changes.log neu
+CHANGES_MAX_BYTES = 512 * 1024
+
+# Geschaetzter Speicherbedarf eines Eintrags (VideoInfo, Strings, Dict-Slot) in Bytes
+ENTRY_SIZE_ESTIMATE = 768
+
+
+def shard_of(video_id):
+    """Shard-Nummer einer Video-ID (0-63)."""
+    return _SHARD_INDEX.get(video_id[:1], 0)
+
+
+class ShardedCache(object):
+    """Dict-aehnlicher Metadaten-Cache {video_id: VideoInfo} mit Lazy-Loading pro Shard."""
+
+    def __init__(self, folder, legacy_files=(), log=None, fallback=None):
+        self.folder = folder
+        self.legacy_files = legacy_files
+        self.fallback = fallback
+        self.shards = {}
+        self.stamps = {}
+        self.dirty = set()
+        # Seit dem letzten Speichern geaenderte IDs (fuer changes.log)
+        self.changed_ids = set()
+        self.log = log or (lambda msg: None)
+        # Kuenstlernamen der geladenen Eintraege (jeder Name einmal)
+        self.artists = ArtistTable()
+
+    def shard_path(self, shard):
+        # Nummerierte Dateinamen, da 'a' und 'A' auf manchen Dateisystemen kollidieren
+        return os.path.join(self.folder, 'shard_{:02d}.json'.format(shard))
+
+    def _read_file(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return decode_cache(json.load(f), self.artists)
+
+    def _stamp(self, shard):
+        try:
+            stat = os.stat(self.shard_path(shard))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _changes_path(self):
+        return os.path.join(self.folder, 'changes.log')
+
+    def change_position(self):
+        """Aktuelle Position im Aenderungsprotokoll ('generation:offset')."""
+        try:
+            with open(self._changes_path(), 'rb') as f:
+                generation = f.readline().strip().decode('ascii')
+                f.seek(0, os.SEEK_END)
+                return '{}:{}'.format(generation, f.tell())
+        except OSError:
+            return ':0'
+
+    def changed_since(self, position):
+        """IDs, die seit position gespeichert wurden (None wenn das nicht mehr feststellbar ist)."""
+        generation, _, offset = (position or '').partition(':')
+        try:
+            with open(self._changes_path(), 'rb') as f:
+                if f.readline().strip().decode('ascii') != generation:
+                    return None
+                f.seek(max(int(offset), f.tell()))
+                return set(f.read().decode('ascii').split())
+        except OSError:
+            # Noch nie gespeichert: nur die leere Anfangsposition ist gueltig
+            return set() if position == ':0' else None
+        except ValueError:
+            return None
+
+    def _log_changes(self, video_ids):
+        path = self._changes_path()
+        if not os.path.exists(path) or os.path.getsize(path) > CHANGES_MAX_BYTES:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write('{:x}\n'.format(time.time_ns()).encode('ascii'))
+            os.replace(tmp_path, path)
+        with open(path, 'ab') as f:
+            f.write((' '.join(video_ids) + '\n').encode('ascii'))
+
+    def _write_file(self, path, entries):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(encode_cache(entries), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def migrate_legacy(self):
+        """Teilt einen alten Cache (eine Datei) einmalig auf die Shards auf."""
+        if os.path.isdir(self.folder):
+            return False
+        os.makedirs(self.folder)
+
+        for path in self.legacy_files:
+            if not os.path.exists(path):
+                continue
+            try:
+                entries = self._read_file(path)
+            except Exception as e:
+                self.log('Error migrating cache {}: {}'.format(path, str(e)))
+                continue
+            for video_id, info in entries.items():
+                self[video_id] = info
+            self.save()
+            self.log('Migrated {} entries from {} into {} shards'.format(
+                len(entries), path, len(self.shards)))
+            return True
+        return False
+
+    def load_shard(self, shard):
+        """Laedt einen Shard falls noch nicht geschehen und gibt dessen Dict zurueck."""
+        entries = self.shards.get(shard)
+        if entries is not None:
+            return entries
+
+        entries = {}
+        path = self.shard_path(shard)
+        self.stamps[shard] = self._stamp(shard)
+        try:
+            if os.path.exists(path):
+                entries = self._read_file(path)
+        except Exception as e:
+            self.log('Error loading cache shard {}: {}'.format(shard, str(e)))
+        self.shards[shard] = entries
+        return entries
+
+    def preload(self, video_ids=None):
+        """Laedt alle Shards, die von video_ids getroffen werden (None = alle)."""
+        if video_ids is None:
+            needed = range(SHARD_COUNT)
+        else:
+            needed = set(shard_of(video_id) for video_id in video_ids)
+        for shard in needed:
+            self.load_shard(shard)
+        return len(needed)
+
+    def save(self):
+        """Schreibt alle geaenderten Shards und gibt deren Anzahl zurueck."""
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        written = 0
+        for shard in sorted(self.dirty):
+            if self._stamp(shard) != self.stamps.get(shard):
+                # Ein anderer Prozess (Dienst oder Plugin) hat den Shard inzwischen
+                # geschrieben: dessen Stand uebernehmen, nur eigene Aenderungen darueber
+                self._merge_from_disk(shard)
+            self._write_file(self.shard_path(shard), self.shards[shard])
+            self.stamps[shard] = self._stamp(shard)
+            written += 1
+        if self.changed_ids:
+            self._log_changes(self.changed_ids)
+        self.dirty.clear()
+        self.changed_ids.clear()
+        return written
+
+    def _merge_from_disk(self, shard):
+        entries = {}
+        try:
+            entries = self._read_file(self.shard_path(shard))
+        except (OSError, ValueError) as e:
+            self.log('Error reloading cache shard {}: {}'.format(shard, str(e)))
+        loaded = self.shards[shard]
+        for video_id in self.changed_ids:
+            if shard_of(video_id) == shard and video_id in loaded:
+                entries[video_id] = loaded[video_id]
+        self.shards[shard] = entries
+
+    def preload_batch_size(self, total):
+        """Wie viele IDs auf einmal vorgeladen werden sollen."""
+        return max(total, 1)
+
+    def missing_ids(self, video_ids):
+        """Gibt die IDs ohne Cache-Eintrag zurueck (ohne Duplikate, Reihenfolge bleibt)."""
+        seen = set()
+        missing = []
+        for video_id in video_ids:
+            if video_id not in seen and video_id not in self:
+                missing.append(video_id)
+            seen.add(video_id)
+        return missing
+
+    def statuses(self, video_ids):
+        """Status-Werte der Videos in gleicher Reihenfolge (None ohne Eintrag)."""
+        result = []
+        for video_id in video_ids:
+            info = self.get(video_id)
+            result.append(info.status if info is not None else None)
+        return result
+
+    def artist_id(self, video_id):
+        """Index des Kuenstlers in der Kuenstler-Tabelle dieses Caches (None ohne Eintrag)."""
+        info = self.get(video_id)
+        return self.artists.add(info.artist) if info is not None else None
+
+    def artist_name(self, artist_id):
+        return self.artists.name(artist_id)
+
+    def group_by_artist(self, video_ids):
+        """Gruppiert Video-IDs nach Kuenstler-Index: {artist_id: [video_id, ...]}.
+
+        Namen liefert artist_name(); IDs ohne Eintrag fehlen im Ergebnis.
+        """
+        groups = {}
+        for video_id in video_ids:
+            artist_id = self.artist_id(video_id)
+            if artist_id is not None:
+                groups.setdefault(artist_id, []).append(video_id)
+        return groups
+
+    def refresh(self):
+        """Verwirft geladene Shards, die sich auf der Festplatte geaendert haben.
+
+        Wichtig wenn der Cache ueber mehrere Aufrufe im Speicher bleibt
+        (reuselanguageinvoker) und ein anderer Prozess die Dateien schreibt.
+        Gibt die Anzahl der verworfenen Shards zurueck.
+        """
+        stale = [shard for shard in self.shards
+                 if shard not in self.dirty and self._stamp(shard) != self.stamps.get(shard)]
+        for shard in stale:
+            del self.shards[shard]
+            del self.stamps[shard]
+        return len(stale)
+
+    def get(self, video_id, default=None):
+        info = self.load_shard(shard_of(video_id)).get(video_id)
+        if info is None and self.fallback is not None:
+            info = self.fallback.get(video_id)
+        return default if info is None else info
+
+    def __contains__(self, video_id):
+        if video_id in self.load_shard(shard_of(video_id)):
+            return True
+        return self.fallback is not None and video_id in self.fallback
+
+    def __getitem__(self, video_id):
+        info = self.get(video_id)
+        if info is None:
+            raise KeyError(video_id)
+        return info
+
+    def __setitem__(self, video_id, info):
+        shard = shard_of(video_id)
+        info.artist = self.artists.intern(info.artist)
+        self.load_shard(shard)[video_id] = info
+        self.dirty.add(shard)
+        self.changed_ids.add(video_id)
+
+    def __len__(self):
+        """Anzahl der Eintraege in den bereits geladenen Shards."""
+        return sum(len(entries) for entries in self.shards.values())
+
+
+class BoundedCache(ShardedCache):
+    """Metadaten-Cache mit fester Obergrenze fuer die Anzahl Eintraege im Speicher.
+
+    Shards werden nur kurz geparst; behalten werden nur die angefragten
+    Eintraege in einem LRU. Geaenderte Eintraege bleiben bis zum Speichern
+    erhalten und werden dann in ihre Shard-Dateien eingearbeitet.
+
+    Einzelabfragen (get) merken sich den zuletzt geparsten Shard, solange er
+    hoechstens halb so viele Eintraege wie das LRU hat; aufeinanderfolgende
+    Fehlzugriffe im selben Shard parsen ihn so nur einmal. Wer viele IDs
+    braucht, sollte sie vorher mit preload() blockweise laden.
+    """
+
+    def __init__(self, folder, max_entries, legacy_files=(), log=None, fallback=None):
+        ShardedCache.__init__(self, folder, legacy_files, log, fallback)
+        self.max_entries = max(max_entries, 1)
+        self.entries = OrderedDict()
+        self.dirty_entries = {}
+        self.absent = set()
+        # (shard, eintraege) des zuletzt von get() geparsten Shards
+        self.last_shard = None
+
+    def _read_file(self, path):
+        # Nicht in die Kuenstler-Tabelle eintragen; behalten wird nur ein Teil
+        with open(path, 'r', encoding='utf-8') as f:
+            return decode_cache(json.load(f))
+
+    def _remember(self, video_id, info):
+        if len(self.artists) >= self.max_entries:
+            # Tabelle neu beginnen, damit sie nicht ueber das LRU hinaus waechst
+            self.artists = ArtistTable()
+        info.artist = self.artists.intern(info.artist)
+        self.entries[video_id] = info
+        self.entries.move_to_end(video_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _scan_shards(self, video_ids):
+        """Parst die betroffenen Shards und liefert (video_id, info oder None)."""
+        by_shard = {}
+        for video_id in video_ids:
+            by_shard.setdefault(shard_of(video_id), []).append(video_id)
+
+        for shard, wanted in by_shard.items():
+            entries = {}
+            path = self.shard_path(shard)
+            self.stamps[shard] = self._stamp(shard)
+            try:
+                if os.path.exists(path):
+                    entries = self._read_file(path)
+            except Exception as e:
+                self.log('Error loading cache shard {}: {}'.format(shard, str(e)))
+            for video_id in wanted:
+                yield video_id, entries.get(video_id)
+
+    def load_shard(self, shard):
+        # Ganze Shards werden im Speicherspar-Modus nicht gehalten
+        entries = {}
+        path = self.shard_path(shard)
+        try:
+            if os.path.exists(path):
+                entries = self._read_file(path)
+        except Exception as e:
+            self.log('Error loading cache shard {}: {}'.format(shard, str(e)))
+        return entries
+
+    def preload(self, video_ids=None):
+        if video_ids is None:
+            return 0
+        video_ids = [video_id for video_id in video_ids
+                     if video_id not in self.entries and video_id not in self.dirty_entries]
+        self.absent.clear()
+        shards = set()
+        for video_id, info in self._scan_shards(video_ids[:self.max_entries]):
+            shards.add(shard_of(video_id))
+            if info is None:
+                self.absent.add(video_id)
+            else:
+                self._remember(video_id, info)
+        return len(shards)
+
+    def preload_batch_size(self, total):
+        return max(min(total, self.max_entries // 2), 1)
+
+    def missing_ids(self, video_ids):
+        # Ohne Sets ueber alle IDs: meist fehlt nur ein kleiner Teil
+        pending = [video_id for video_id in video_ids
+                   if video_id not in self.entries and video_id not in self.dirty_entries]
+        missing = set(video_id for video_id, info in self._scan_shards(pending)
+                      if info is None and (self.fallback is None or video_id not in self.fallback))
+        result = []
+        for video_id in pending:
+            if video_id in missing:
+                missing.discard(video_id)
+                result.append(video_id)
+        return result
+
+    def statuses(self, video_ids):
+        # Shard fuer Shard lesen, ohne Eintraege im LRU abzulegen
+        result = [None] * len(video_ids)
+        by_shard = {}
+        for index, video_id in enumerate(video_ids):
+            by_shard.setdefault(shard_of(video_id), []).append(index)
+        for shard, indexes in by_shard.items():
+            entries = self.load_shard(shard)
+            for index in indexes:
+                video_id = video_ids[index]
+                info = self.dirty_entries.get(video_id) or entries.get(video_id)
+                if info is None and self.fallback is not None:
+                    info = self.fallback.get(video_id)
+                if info is not None:
+                    result[index] = info.status
+        return result
+
+    def group_by_artist(self, video_ids):
+        # Shard fuer Shard lesen wie statuses(); die Tabelle wird dabei nicht
+        # zurueckgesetzt, die Indizes gelten bis zum naechsten Zuruecksetzen
+        artist_ids = [None] * len(video_ids)
+        by_shard = {}
+        for index, video_id in enumerate(video_ids):
+            by_shard.setdefault(shard_of(video_id), []).append(index)
+        for shard, indexes in by_shard.items():
+            entries = self.load_shard(shard)
+            for index in indexes:
+                video_id = video_ids[index]
+                info = self.dirty_entries.get(video_id) or entries.get(video_id)
+                if info is None and self.fallback is not None:
+                    info = self.fallback.get(video_id)
+                if info is not None:
+                    artist_ids[index] = self.artists.add(info.artist)
+        groups = {}
+        for video_id, artist_id in zip(video_ids, artist_ids):
+            if artist_id is not None:
+                groups.setdefault(artist_id, []).append(video_id)
+        return groups
+
+    def save(self):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        by_shard = {}
+        for video_id, info in self.dirty_entries.items():
+            by_shard.setdefault(shard_of(video_id), {})[video_id] = info
+        for shard, changed in sorted(by_shard.items()):
+            entries = self.load_shard(shard)
+            entries.update(changed)
+            self._write_file(self.shard_path(shard), entries)
+            self.stamps[shard] = self._stamp(shard)
+        if by_shard:
+            self._log_changes(self.dirty_entries)
+        self.dirty_entries.clear()
+        self.dirty.clear()
+        self.last_shard = None
+        return len(by_shard)
+
+    def refresh(self):
+        stale = set(shard for shard in self.stamps if self._stamp(shard) != self.stamps[shard])
+        self.last_shard = None
+        if not stale:
+            return 0
+        for video_id in [video_id for video_id in self.entries if shard_of(video_id) in stale]:
+            del self.entries[video_id]
+        self.absent.clear()
+        for shard in stale:
+            del self.stamps[shard]
+        return len(stale)
+
+    def get(self, video_id, default=None):
+        info = self.dirty_entries.get(video_id)
+        if info is None:
+            info = self.entries.get(video_id)
+            if info is not None:
+                self.entries.move_to_end(video_id)
+            elif video_id not in self.absent:
+                info = self._shard_entries(shard_of(video_id)).get(video_id)
+                if info is None:
+                    self.absent.add(video_id)
+                else:
+                    self._remember(video_id, info)
+        if info is None and self.fallback is not None:
+            info = self.fallback.get(video_id)
+        return default if info is None else info
+
+    def _shard_entries(self, shard):
+        if self.last_shard is not None and self.last_shard[0] == shard:
+            return self.last_shard[1]
+        self.stamps[shard] = self._stamp(shard)
+        entries = self.load_shard(shard)
+        self.last_shard = (shard, entries) if len(entries) <= self.max_entries // 2 else None
+        return entries
+
+    def __contains__(self, video_id):
+        return self.get(video_id) is not None
+
+    def __setitem__(self, video_id, info):
+        self.dirty_entries[video_id] = info
+        self.dirty.add(shard_of(video_id))
+        self.absent.discard(video_id)
+        self._remember(video_id, info)
+        # Geaenderte Eintraege nicht unbegrenzt ansammeln
+        if len(self.dirty_entries) >= self.max_entries:
+            self.save()
+
+    def __len__(self):
+        return len(self.entries)
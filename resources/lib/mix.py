@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Gewichtete Rotation ueber mehrere Kanaele ("Mix")
+#
+# Wie bei MTV (Heavy/Medium/Light Rotation) wird jeder Kanal mit einem
+# Gewicht gezogen, innerhalb des Kanals gleichverteilt. Fuer die Kanalwahl
+# wird einmal eine Alias-Tabelle (Vose) aufgebaut; danach kostet jede
+# Ziehung O(1), unabhaengig von der Zahl der Kanaele und Videos.
+
+import random
+
+
+def parse_weights(text):
+    """Liest 'kanal:gewicht, kanal:gewicht, ...' in {kanal: gewicht}.
+
+    Ungueltige Eintraege und Gewichte <= 0 werden ignoriert.
+    """
+    weights = {}
+    for part in text.split(','):
+        channel_id, _, weight = part.partition(':')
+        channel_id = channel_id.strip()
+        try:
+            weight = float(weight)
+        except ValueError:
+            continue
+        if channel_id and weight > 0:
+            weights[channel_id] = weights.get(channel_id, 0) + weight
+    return weights
+
+
+class AliasTable(object):
+    """Ziehen eines Index i mit Wahrscheinlichkeit weights[i] / sum(weights) in O(1)."""
+
+    def __init__(self, weights):
+        count = len(weights)
+        if not count:
+            raise ValueError('no weights')
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Reste (Rundungsfehler) behalten Wahrscheinlichkeit 1
+
+    def draw(self, rng=random):
+        column = rng.randrange(len(self.probability))
+        if rng.random() < self.probability[column]:
+            return column
+        return self.alias[column]
+
+    def __len__(self):
+        return len(self.probability)
+
+
+class MixSampler(object):
+    """Zieht (channel_id, position im kanal) nach Kanalgewichten.
+
+    Kanaele ohne Videos oder unbekannte Kanaele werden uebergangen. key
+    beschreibt Gewichte und Kanalgroessen; aendert sich eines davon, muss ein
+    neuer Sampler gebaut werden.
+    """
+
+    def __init__(self, weights, channel_counts):
+        self.channel_ids = sorted(channel_id for channel_id in weights
+                                  if channel_counts.get(channel_id))
+        self.counts = [channel_counts[channel_id] for channel_id in self.channel_ids]
+        self.key = self.make_key(weights, channel_counts)
+        self.table = AliasTable([weights[channel_id] for channel_id in self.channel_ids]) \
+            if self.channel_ids else None
+
+    @staticmethod
+    def make_key(weights, channel_counts):
+        return tuple((channel_id, weights[channel_id], channel_counts.get(channel_id, 0))
+                     for channel_id in sorted(weights))
+
+    def draw(self, rng=random):
+        channel = self.table.draw(rng)
+        return self.channel_ids[channel], rng.randrange(self.counts[channel])
+
+    def __bool__(self):
+        return self.table is not None
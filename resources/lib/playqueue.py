@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Schrittweise befuellte Wiedergabeliste
+#
+# Beim Abspielen eines Kanals (der Reihe nach oder zufaellig) liegen nur die
+# naechsten WINDOW_SIZE Videos in der Kodi-Playlist. Der Dienst (service.py)
+# haengt weitere an, sobald die Wiedergabe voranschreitet. Der Zustand der
+# Session liegt in einer kleinen JSON-Datei, damit Plugin und Dienst ihn
+# teilen koennen.
+
+import json
+import os
+
+# Anzahl der Videos, die nach dem aktuellen Video in der Playlist liegen sollen
+WINDOW_SIZE = 10
+
+MODE_SEQUENTIAL = 'sequential'
+MODE_SHUFFLE = 'shuffle'
+MODE_MIX = 'mix'
+# Wie MODE_SEQUENTIAL, beginnt aber nach dem letzten Video wieder von vorn
+MODE_LIVE = 'live'
+
+
+def new_state(mode, scope, position=0):
+    """Zustand einer Session. scope ist ein Kanal, shuffle.SCOPE_ALL oder None (Mix),
+    position der naechste Index (MODE_SEQUENTIAL, MODE_LIVE), size die
+    Playlist-Groesse nach dem letzten Befuellen."""
+    return {'mode': mode, 'scope': scope, 'position': position, 'size': 0}
+
+def owns_playlist(state, playlist_size):
+    """True, solange die Playlist zu dieser Session gehoert (Groesse wurde
+    nicht ausserhalb des Addons geaendert)."""
+    return playlist_size == state.get('size')
+
+def missing_count(state, playlist_size, playlist_position):
+    """Wie viele Videos angehaengt werden muessen, um das Fenster zu fuellen.
+
+    Gibt 0 zurueck, wenn die Playlist nicht mehr zu dieser Session gehoert.
+    """
+    if not owns_playlist(state, playlist_size):
+        return 0
+    upcoming = playlist_size - max(playlist_position, 0) - 1
+    return max(WINDOW_SIZE - upcoming, 0)
+
+def load_state(path):
+    """Liest den Session-Zustand; None wenn keine Session existiert."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+def save_state(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
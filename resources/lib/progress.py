@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Fortschrittsanzeige fuer lange Ladevorgaenge
+#
+# Zeigt Anzahl, Rate (Videos/Sekunde) und Restzeit in einem Hintergrund-Dialog.
+# Der Dialog wird hoechstens alle UPDATE_INTERVAL Sekunden aktualisiert, damit
+# die UI-Aufrufe die Lade-Schleife nicht ausbremsen.
+
+import time
+
+UPDATE_INTERVAL = 0.5
+
+
+def format_eta(seconds):
+    seconds = int(seconds + 0.5)
+    if seconds >= 3600:
+        return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+    return '{}:{:02d}'.format(seconds // 60, seconds % 60)
+
+
+class FetchProgress(object):
+    """Fortschritt eines Ladevorgangs mit gedrosselten Dialog-Updates."""
+
+    def __init__(self, dialog, heading, total, clock=time.time):
+        self.dialog = dialog
+        self.heading = heading
+        self.total = total
+        self.clock = clock
+        self.started = clock()
+        self.next_update = 0
+        self.dialog.create(heading, self.message(0))
+
+    def rate(self, done):
+        elapsed = self.clock() - self.started
+        return done / elapsed if elapsed > 0 else 0.0
+
+    def message(self, done):
+        rate = self.rate(done)
+        if rate > 0 and done < self.total:
+            eta = format_eta((self.total - done) / rate)
+        else:
+            eta = '-:--'
+        return '{} / {} Videos - {:.1f}/s - noch {}'.format(done, self.total, rate, eta)
+
+    def update(self, done):
+        """Aktualisiert den Dialog, aber nur wenn das letzte Update lange genug her ist."""
+        now = self.clock()
+        if now < self.next_update and done < self.total:
+            return False
+        self.next_update = now + UPDATE_INTERVAL
+        percent = int(done * 100 / self.total) if self.total else 100
+        self.dialog.update(percent, self.heading, self.message(done))
+        return True
+
+    def close(self):
+        self.dialog.close()
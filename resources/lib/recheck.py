@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Regelmaessige Pruefung der Verfuegbarkeit
+#
+# Videos verschwinden laufend von YouTube. Statt regelmaessig alle 35.000
+# Eintraege zu pruefen, verbraucht der Dienst ein taegliches Anfrage-Budget
+# und waehlt die Videos nach Prioritaet:
+#   1. zuletzt fehlgeschlagen (Laden oder Wiedergabe) und seitdem nicht geprueft,
+#      oder nicht abspielbar und UNPLAYABLE_RETRY_AGE abgelaufen
+#   2. zuletzt gespielt und laenger nicht geprueft
+#   3. noch nie geprueft (Zufallsauswahl ueber den ganzen Katalog)
+#   4. am laengsten nicht geprueft
+# Zeitpunkte der letzten Pruefung bzw. des letzten Fehlers liegen als
+# Unix-Zeit in eigenen Dateien (records.py).
+
+import datetime
+import heapq
+import json
+import os
+import random
+import struct
+
+from resources.lib.metadata_index import id_key
+from resources.lib.records import RecordStore
+
+DAY = 86400
+
+# Zuletzt gespielte Videos werden erst nach so vielen Sekunden erneut geprueft
+PLAYED_RECHECK_AGE = 7 * DAY
+
+# Bereits gepruefte Videos fruehestens nach so vielen Sekunden erneut pruefen
+MIN_RECHECK_AGE = DAY
+
+# Nicht abspielbare Videos (Wiedergabe fehlgeschlagen, oEmbed ok) bekommen
+# erst nach so vielen Sekunden seit dem Fehler eine neue Chance
+UNPLAYABLE_RETRY_AGE = 30 * DAY
+
+# Altersklassen fuer den Bericht: (Bezeichnung, Hoechstalter in Tagen)
+AGE_BUCKETS = (('< 1 Tag', 1), ('< 1 Woche', 7), ('< 1 Monat', 30), ('< 3 Monate', 90), ('älter', None))
+
+
+class TimestampStore(RecordStore):
+    """Unix-Zeit pro Video (letzte Pruefung bzw. letzter Fehler)."""
+
+    record = struct.Struct('<QI')
+
+
+def select_candidates(video_ids, checked, failed, played_keys, limit, now, unplayable=None):
+    """Waehlt bis zu limit IDs in der Reihenfolge der Prioritaeten (siehe oben).
+
+    unplayable: Zeitpunkt der letzten fehlgeschlagenen Wiedergabe pro Video
+    (optional); nach UNPLAYABLE_RETRY_AGE ist eine neue Pruefung faellig.
+    """
+    recent_failures = []
+    played = []
+    never = []
+    oldest = []
+    for video_id in video_ids:
+        key = id_key(video_id)
+        if key is None:
+            continue
+        checked_at = checked.get_key(key, 0)
+        failed_at = failed.get_key(key, 0)
+        retry_at = unplayable.get_key(key, 0) + UNPLAYABLE_RETRY_AGE if unplayable is not None else 0
+        if failed_at > checked_at:
+            recent_failures.append((-failed_at, video_id))
+        elif checked_at < retry_at <= now:
+            recent_failures.append((-retry_at, video_id))
+        elif key in played_keys and now - checked_at > PLAYED_RECHECK_AGE:
+            played.append((checked_at, video_id))
+        elif not checked_at:
+            never.append(video_id)
+        elif now - checked_at > MIN_RECHECK_AGE:
+            oldest.append((checked_at, video_id))
+
+    result = [video_id for _, video_id in heapq.nsmallest(limit, recent_failures)]
+    result.extend(video_id for _, video_id in heapq.nsmallest(limit - len(result), played))
+    result.extend(random.sample(never, min(max(limit - len(result), 0), len(never))))
+    result.extend(video_id for _, video_id in heapq.nsmallest(max(limit - len(result), 0), oldest))
+    return result[:limit]
+
+def age_histogram(video_ids, checked, now):
+    """Verteilung des Pruefalters: [(bezeichnung, anzahl), ...], 'nie' zuerst."""
+    never = 0
+    counts = [0] * len(AGE_BUCKETS)
+    for video_id in video_ids:
+        checked_at = checked.get(video_id, 0)
+        if not checked_at:
+            never += 1
+            continue
+        age_days = (now - checked_at) / float(DAY)
+        for idx, (_, max_days) in enumerate(AGE_BUCKETS):
+            if max_days is None or age_days < max_days:
+                counts[idx] += 1
+                break
+    return [('nie', never)] + [(label, count) for (label, _), count in zip(AGE_BUCKETS, counts)]
+
+def format_histogram(histogram):
+    total = sum(count for _, count in histogram) or 1
+    return ', '.join('{}: {} ({:.0f}%)'.format(label, count, count * 100.0 / total)
+                     for label, count in histogram)
+
+
+class DailyBudget(object):
+    """Anfrage-Budget pro Kalendertag, verteilt auf die restlichen Laeufe des Tages."""
+
+    def __init__(self, path, per_day):
+        self.path = path
+        self.per_day = per_day
+        self.day = None
+        self.used = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.day = data.get('day')
+                self.used = data.get('used', 0)
+            except ValueError:
+                pass
+
+    def allowance(self, now, interval):
+        """Anfragen fuer diesen Lauf: Rest des Tages gleichmaessig auf die
+        verbleibenden Laeufe (alle interval Sekunden) verteilt."""
+        today = datetime.date.fromtimestamp(now).isoformat()
+        if self.day != today:
+            self.day = today
+            self.used = 0
+        remaining = max(self.per_day - self.used, 0)
+        midnight = datetime.datetime.combine(datetime.date.fromtimestamp(now) + datetime.timedelta(days=1),
+                                             datetime.time())
+        runs_left = int((midnight - datetime.datetime.fromtimestamp(now)).total_seconds() // interval) + 1
+        return -(-remaining // runs_left)
+
+    def spend(self, count):
+        self.used += count
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'day': self.day, 'used': self.used}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kleine Binaerdateien mit einem Wert pro Video
+#
+# Pro Video ein Datensatz fester Laenge: 64-Bit-Schluessel der ID (siehe
+# metadata_index.id_key) plus Wert. Neue Werte werden nur angehaengt; beim
+# Laden gewinnt der letzte Datensatz. Dadurch bleibt bei einem Abbruch alles
+# bereits Geschriebene erhalten, und ein weiterer Lauf setzt einfach fort.
+
+import os
+import struct
+
+from resources.lib.metadata_index import id_key
+
+
+class RecordStore(object):
+    """Werte pro Video, nach 64-Bit-Schluessel der ID. Unterklassen legen
+    record (struct mit Schluessel und Wert) und encode() fest."""
+
+    record = struct.Struct('<QI')
+
+    def __init__(self, path):
+        self.path = path
+        self.values = {}
+        self.stamp = None
+        # Aendert sich bei jedem neuen Wert (z.B. fuer abgeleitete Daten)
+        self.version = 0
+        self.refresh()
+
+    def encode(self, value):
+        return int(value or 0)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def refresh(self):
+        """Liest die Datei neu, wenn sie von aussen (anderer Prozess) geaendert wurde."""
+        stamp = self._file_stamp()
+        if stamp == self.stamp:
+            return False
+        values = {}
+        if stamp is not None:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % self.record.size
+            for key, value in self.record.iter_unpack(data[:usable]):
+                values[key] = value
+        self.values = values
+        self.stamp = stamp
+        self.version += 1
+        return True
+
+    def add(self, results):
+        """Haengt {video_id: wert} an die Datei an. Gibt die Anzahl neuer Datensaetze zurueck."""
+        records = []
+        for video_id, value in results.items():
+            key = id_key(video_id)
+            if key is None:
+                continue
+            value = self.encode(value)
+            self.values[key] = value
+            records.append(self.record.pack(key, value))
+        if not records:
+            return 0
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(records))
+        self.stamp = self._file_stamp()
+        self.version += 1
+        return len(records)
+
+    def get_key(self, key, default=None):
+        value = self.values.get(key)
+        return value if value else default
+
+    def get(self, video_id, default=None):
+        """Wert des Videos; default wenn unbekannt oder 0."""
+        return self.get_key(id_key(video_id), default)
+
+    def missing_ids(self, video_ids):
+        """IDs ohne Datensatz (ohne Duplikate)."""
+        seen = set()
+        missing = []
+        for video_id in video_ids:
+            key = id_key(video_id)
+            if key is None or key in self.values or key in seen:
+                continue
+            seen.add(key)
+            missing.append(video_id)
+        return missing
+
+    def __contains__(self, video_id):
+        return bool(self.get(video_id))
+
+    def __len__(self):
+        return len(self.values)
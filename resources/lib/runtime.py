@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Langlebiger Zustand fuer reuselanguageinvoker
+#
+# Mit reuselanguageinvoker fuehrt Kodi addon.py bei jedem Klick im selben
+# Interpreter erneut aus. Die Globals von addon.py werden dabei neu angelegt,
+# importierte Module (resources.lib.*) bleiben aber erhalten. Alles was pro
+# Kodi-Sitzung nur einmal geladen werden soll, lebt deshalb hier. Werte die
+# nur fuer einen Aufruf gelten (Handle, Basis-URL, Parameter) stehen im
+# RequestContext und werden nie beim Import aus sys.argv gelesen.
+
+from urllib.parse import parse_qsl
+
+from resources.lib.fetcher import FetchQueue
+from resources.lib.metadata_store import ShardedCache, BoundedCache
+from resources.lib.mix import MixSampler
+from resources.lib.broadcast import Schedule
+
+_METADATA_CACHE = None
+_FETCH_QUEUE = FetchQueue()
+_MIX_SAMPLER = None
+_SCHEDULES = {}
+_RECORD_STORES = {}
+_MANIFEST = None
+
+
+class RequestContext(object):
+    """Daten eines einzelnen Plugin-Aufrufs."""
+    __slots__ = ('base_url', 'handle', 'params', 'token')
+
+    def __init__(self, argv, token=None):
+        self.base_url = argv[0]
+        self.handle = int(argv[1]) if len(argv) > 1 else -1
+        self.params = dict(parse_qsl(argv[2][1:])) if len(argv) > 2 else {}
+        # Kennung dieses Aufrufs fuer die Abbruch-Erkennung
+        self.token = token
+
+
+def get_metadata_cache(folder, legacy_files, log, max_entries=0):
+    """Gibt den prozessweiten Metadaten-Cache zurueck und legt ihn beim ersten Aufruf an.
+
+    Mit max_entries > 0 wird ein BoundedCache mit dieser Obergrenze verwendet.
+    """
+    global _METADATA_CACHE
+    cache = _METADATA_CACHE
+    if (cache is None or cache.folder != folder
+            or getattr(cache, 'max_entries', 0) != max_entries):
+        if cache is not None:
+            cache.save()
+        if max_entries > 0:
+            _METADATA_CACHE = BoundedCache(folder, max_entries, legacy_files, log)
+        else:
+            _METADATA_CACHE = ShardedCache(folder, legacy_files, log)
+    else:
+        # Logger des aktuellen Aufrufs verwenden
+        _METADATA_CACHE.log = log
+    return _METADATA_CACHE
+
+
+def get_fetch_queue():
+    """Prozessweite Warteschlange offener Metadaten-Anfragen.
+
+    Bleibt ueber mehrere Aufrufe erhalten, damit ein Seitenwechsel die noch
+    offenen Anfragen nur neu priorisiert.
+    """
+    return _FETCH_QUEUE
+
+
+def get_mix_sampler(weights, channel_counts):
+    """Gibt den Sampler fuer den Mix-Modus zurueck.
+
+    Die Alias-Tabelle wird nur neu aufgebaut, wenn sich Gewichte oder
+    Kanalgroessen geaendert haben.
+    """
+    global _MIX_SAMPLER
+    if _MIX_SAMPLER is None or _MIX_SAMPLER.key != MixSampler.make_key(weights, channel_counts):
+        _MIX_SAMPLER = MixSampler(weights, channel_counts)
+    return _MIX_SAMPLER
+
+
+def get_schedule(channel_id, video_ids, durations=None, key=None):
+    """Gibt den Sendeplan eines Kanals zurueck.
+
+    Die Praefixsummen werden nur neu berechnet, wenn sich key (Kanal-Inhalt
+    bzw. Stand der Dauern) geaendert hat.
+    """
+    schedule = _SCHEDULES.get(channel_id)
+    if schedule is None or schedule.key != key:
+        schedule = _SCHEDULES[channel_id] = Schedule(video_ids, durations, key)
+    return schedule
+
+
+def get_record_store(store_class, path):
+    """Gibt die Datei-Werte pro Video (z.B. DurationStore) fuer path zurueck;
+    Aenderungen anderer Prozesse werden nachgeladen."""
+    store = _RECORD_STORES.get(path)
+    if store is None or not isinstance(store, store_class):
+        store = _RECORD_STORES[path] = store_class(path)
+    else:
+        store.refresh()
+    return store
+
+
+def get_manifest(load):
+    """Gibt das Katalog-Manifest zurueck; load() laeuft nur beim ersten Aufruf."""
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = load()
+    return _MANIFEST
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Zufallswiedergabe ohne gemischte Listen
+#
+# Statt eine Liste mit bis zu 35.000 IDs zu kopieren und zu mischen, wird die
+# Reihenfolge ueber eine schluesselabhaengige Permutation der Indizes
+# berechnet (Feistel-Netz mit Cycle-Walking). Position k einer Session ist
+# direkt berechenbar; zum Fortsetzen reichen Seed und Position.
+
+import bisect
+import json
+import os
+import random
+
+# Runden des Feistel-Netzes (4 reichen fuer eine gut gemischte Reihenfolge)
+FEISTEL_ROUNDS = 4
+
+# Schluessel der Session ueber alle Kanaele
+SCOPE_ALL = '*'
+
+
+def _round_function(value, round_key, mask):
+    x = (value * 0x9E3779B1 + round_key) & 0xFFFFFFFF
+    x ^= x >> 16
+    x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+    x ^= x >> 13
+    return x & mask
+
+
+class FeistelPermutation(object):
+    """Bijektive Abbildung von [0, size) auf [0, size), bestimmt durch seed.
+
+    Das Netz arbeitet auf der kleinsten Zweierpotenz >= size mit gerader
+    Bitzahl; Werte ausserhalb von [0, size) werden erneut verschluesselt
+    (Cycle-Walking). Im Mittel sind dafuer weniger als 4 Durchlaeufe noetig.
+    """
+
+    def __init__(self, size, seed, rounds=FEISTEL_ROUNDS):
+        self.size = size
+        bits = max((size - 1).bit_length(), 2)
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.round_keys = [rng.getrandbits(32) for _ in range(rounds)]
+
+    def _encrypt(self, value):
+        left = value >> self.half_bits
+        right = value & self.mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ _round_function(right, round_key, self.mask)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self):
+        return self.size
+
+
+class ChannelSpace(object):
+    """Gemeinsamer Indexraum mehrerer Kanaele (hintereinander gehaengt).
+
+    get_channel_ids(channel_id) liefert die IDs eines Kanals; geladen wird
+    erst, wenn ein Index des Kanals abgefragt wird.
+    """
+
+    def __init__(self, channel_counts, get_channel_ids):
+        self.channel_ids = sorted(channel_counts)
+        self.offsets = []
+        total = 0
+        for channel_id in self.channel_ids:
+            self.offsets.append(total)
+            total += channel_counts[channel_id]
+        self.size = total
+        self.get_channel_ids = get_channel_ids
+        self.loaded = {}
+
+    def locate(self, index):
+        """Gibt (channel_id, position im kanal) fuer einen globalen Index zurueck."""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        channel = bisect.bisect_right(self.offsets, index) - 1
+        return self.channel_ids[channel], index - self.offsets[channel]
+
+    def __getitem__(self, index):
+        channel_id, offset = self.locate(index)
+        video_ids = self.loaded.get(channel_id)
+        if video_ids is None:
+            video_ids = self.loaded[channel_id] = self.get_channel_ids(channel_id)
+        return video_ids[offset]
+
+    def __len__(self):
+        return self.size
+
+
+class ShuffleSession(object):
+    """Zufallsreihenfolge ueber eine Folge von IDs (Liste oder ChannelSpace)."""
+
+    def __init__(self, items, seed, position=0):
+        self.items = items
+        self.seed = seed
+        self.position = position
+        self.order = FeistelPermutation(len(items), seed)
+
+    def at(self, position):
+        return self.items[self.order[position]]
+
+    def take(self, count):
+        """Gibt die naechsten count IDs zurueck und rueckt die Position vor.
+
+        Am Ende der Folge beginnt eine neue Runde mit neuem Seed.
+        """
+        result = []
+        while len(result) < count and len(self.items):
+            if self.position >= len(self.items):
+                self.seed = new_seed()
+                self.position = 0
+                self.order = FeistelPermutation(len(self.items), self.seed)
+            result.append(self.at(self.position))
+            self.position += 1
+        return result
+
+    def to_state(self):
+        return {'seed': self.seed, 'position': self.position, 'size': len(self.items)}
+
+
+def new_seed():
+    return random.getrandbits(48)
+
+def open_session(states, scope, items):
+    """Setzt die gespeicherte Session fuer scope fort oder beginnt eine neue
+    (auch wenn sich die Anzahl der Videos geaendert hat)."""
+    state = states.get(scope)
+    if state and state.get('size') == len(items):
+        return ShuffleSession(items, state['seed'], state['position'])
+    return ShuffleSession(items, new_seed())
+
+def load_sessions(path):
+    """Liest die gespeicherten Sessions {scope: state}; leer bei Fehlern."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def save_sessions(path, states):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(states, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Gespeicherte Kanal-Listen
+#
+# Die Zeilen einer Kanal-Liste (URL, Label, Titel, Kuenstler, Plot, Bilder,
+# weitere Kanaele) aendern sich nur, wenn sich die IDs des Kanals oder die
+# Metadaten genau dieser Videos aendern. Der Schluessel eines Snapshots ist
+# ein Hash der IDs; dazu merkt sich der Snapshot die Position im
+# Aenderungsprotokoll des Caches (siehe metadata_store). Er verfaellt nur,
+# wenn seitdem eine ID des Kanals gespeichert wurde - Aenderungen an anderen
+# Kanaelen im selben Shard lassen ihn gueltig.
+
+import hashlib
+import json
+import os
+
+# Aufbau der Zeilen; bei Aenderungen erhoehen, damit alte Snapshots verfallen
+SNAPSHOT_FORMAT = 3
+
+
+def snapshot_key(video_ids, variant):
+    """Schluessel fuer die Liste eines Kanals; variant unterscheidet Darstellungsarten."""
+    digest = hashlib.sha1('{}:{}'.format(SNAPSHOT_FORMAT, variant).encode('utf-8'))
+    digest.update('\n'.join(video_ids).encode('utf-8'))
+    return digest.hexdigest()
+
+def _snapshot_path(folder, channel_id):
+    return os.path.join(folder, '{}.json'.format(channel_id))
+
+def load_snapshot(folder, channel_id, key, video_ids=None, changed_since=None):
+    """Gibt die gespeicherten Zeilen zurueck oder None, wenn der Snapshot fehlt oder veraltet ist.
+
+    Mit changed_since(position) -> IDs (None = unbekannt) verfaellt der
+    Snapshot, sobald eine der video_ids seit seiner Erstellung geaendert wurde.
+    """
+    path = _snapshot_path(folder, channel_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('key') != key:
+        return None
+    if changed_since is not None:
+        changed = changed_since(data.get('since'))
+        if changed is None or not changed.isdisjoint(video_ids):
+            return None
+    return [tuple(row) for row in data['rows']]
+
+def save_snapshot(folder, channel_id, key, rows, since=None):
+    """Speichert die Zeilen; since ist die Protokoll-Position vor dem Lesen der Metadaten."""
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    path = _snapshot_path(folder, channel_id)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'since': since, 'rows': rows}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
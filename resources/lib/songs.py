@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Erkennung mehrfach hochgeladener Songs
+#
+# Viele Songs gibt es in mehreren Uploads (offizielles Video, Remaster, Live,
+# Lyric-Video). Kuenstler und Titel werden normalisiert (Klammerzusaetze,
+# "feat."-Angaben, Zusaetze wie "- Live" und Satzzeichen entfernt) und der
+# normalisierte Schluessel gehasht. Gleicher Hash = gleicher Song. Das ist
+# ein einziger Durchlauf ueber die Titel, also linear in der Anzahl Videos.
+#
+# Die Song-IDs liegen in einer eigenen Datei (records.py, '<QQ'); 0 heisst
+# "keine brauchbaren Metadaten".
+
+import hashlib
+import re
+import struct
+import unicodedata
+
+from resources.lib.metadata import STATUS_OK
+from resources.lib.records import RecordStore
+
+_BRACKETS = re.compile(r'[\(\[\{][^\)\]\}]*[\)\]\}]')
+_FEATURING = re.compile(r'\s+(?:feat\.?|ft\.?|featuring)\s+.*$')
+_VERSION_SUFFIX = re.compile(r'\s+[-/|]\s+.*\b(?:live|remaster(?:ed)?|version|edit|mix|lyrics?|'
+                             r'official|video|audio|hd|hq|4k|acoustic|unplugged)\b.*$')
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Vereinfacht Kuenstler oder Titel auf einen Vergleichsschluessel."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    text = _BRACKETS.sub(' ', text)
+    text = _FEATURING.sub('', text)
+    text = _VERSION_SUFFIX.sub('', text)
+    text = _NON_WORD.sub(' ', text).strip()
+    if text.startswith('the '):
+        text = text[4:]
+    return text
+
+def song_id(artist, title):
+    """64-Bit-Song-ID aus Kuenstler und Titel; None wenn der Titel leer ist."""
+    title = normalize(title)
+    if not title:
+        return None
+    key = '{}|{}'.format(normalize(artist), title).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+def info_song_id(info):
+    """Song-ID eines VideoInfo; None fuer Platzhalter ohne echte Metadaten."""
+    if info is None or info.status != STATUS_OK:
+        return None
+    return song_id(info.artist, info.title)
+
+
+class SongStore(RecordStore):
+    """Song-ID pro Video."""
+
+    record = struct.Struct('<QQ')
+
+
+def cluster(infos):
+    """Ordnet (video_id, VideoInfo)-Paare Songs zu: {video_id: song_id oder 0}."""
+    return dict((video_id, info_song_id(info) or 0) for video_id, info in infos)
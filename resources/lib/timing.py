@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Zeitmessung der Phasen eines Plugin-Aufrufs
+#
+# Phasen (Playlist-Import, Cache laden, Netzwerk, ListItems, ...) werden mit
+# span() umschlossen; gleichnamige Phasen werden aufsummiert. Verschachtelte
+# Phasen zaehlen nur bei sich selbst: Speichert "fetch" zwischendurch den
+# Cache ("cache_save"), fehlt diese Zeit in "fetch". Am Ende des
+# Aufrufs entsteht ein Datensatz mit Gesamtzeit, Phasen und Zeitmarken
+# (z.B. "Liste sichtbar"). Ausgeschaltet liefert span() einen leeren
+# Kontext, die Messung kostet dann praktisch nichts.
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL_SPAN = nullcontext()
+
+
+class PhaseTimer(object):
+    """Summiert die Dauer benannter Phasen seit started (perf_counter-Zeit)."""
+
+    def __init__(self, enabled, started=None, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.started = clock() if started is None else started
+        # name -> [sekunden, anzahl]
+        self.phases = {}
+        self.marks = {}
+        # Dauer der inneren Phasen pro offener Phase (innerste zuletzt)
+        self.nested = []
+        # Von Phasen abgedeckte Zeit (fuer "other")
+        self.covered = 0.0
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        self.nested.append(0.0)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            seconds = self.clock() - start
+            self._record(name, seconds - self.nested.pop())
+            if self.nested:
+                self.nested[-1] += seconds
+
+    def _record(self, name, seconds):
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+        self.covered += seconds
+
+    def add(self, name, seconds):
+        """Rechnet eine extern gemessene Phase an (z.B. den Start bis zum Router)."""
+        if not self.enabled:
+            return
+        self._record(name, seconds)
+        if self.nested:
+            self.nested[-1] += seconds
+
+    def mark(self, name):
+        """Merkt sich die bisher vergangene Zeit unter name."""
+        if self.enabled:
+            self.marks[name] = self.clock() - self.started
+
+    def record(self, **fields):
+        """Datensatz des Aufrufs (Zeiten in Millisekunden) plus fields."""
+        total = self.clock() - self.started
+        record = dict(fields)
+        record['ts'] = int(time.time())
+        record['total_ms'] = round(total * 1000, 1)
+        record['phases'] = dict((name, round(seconds * 1000, 1)) for name, (seconds, _) in self.phases.items())
+        record['counts'] = dict((name, count) for name, (_, count) in self.phases.items() if count > 1)
+        record['marks'] = dict((name, round(seconds * 1000, 1)) for name, seconds in self.marks.items())
+        record['other_ms'] = round(max(total - self.covered, 0) * 1000, 1)
+        return record
+
+
+def format_record(record):
+    """Eine Log-Zeile: total=...ms visible=...ms startup=...ms fetch=...ms(x3) ... other=...ms"""
+    parts = ['total={}ms'.format(record['total_ms'])]
+    parts.extend('{}={}ms'.format(name, ms) for name, ms in record['marks'].items())
+    for name, ms in record['phases'].items():
+        count = record['counts'].get(name)
+        parts.append('{}={}ms{}'.format(name, ms, '(x{})'.format(count) if count else ''))
+    parts.append('other={}ms'.format(record['other_ms']))
+    return ' '.join(parts)
+
+def append_record(path, record):
+    """Haengt den Datensatz als JSON-Zeile an path an."""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Hintergrund-Dienst
+#
+# Haengt bei laufender Wiedergabe ("Alle abspielen", Zufallswiedergabe)
+# weitere Videos an die Playlist an, sobald ein neues Video startet, und
+# prueft im Leerlauf regelmaessig die Verfuegbarkeit der Videos.
+#
+# Jedes gestartete Video wird als "zuletzt gespielt" gemerkt; die
+# Verfuegbarkeits-Pruefung sieht sich diese Videos bevorzugt an.
+#
+# Videos einer Session, deren Wiedergabe fehlschlaegt oder nach wenigen
+# Sekunden endet, werden uebersprungen und geprueft (siehe
+# addon.mark_playback_failure). Die Player-Callbacks merken sich nur die IDs;
+# Dateizugriffe und Netzwerk-Anfragen laufen in der Hauptschleife.
+#
+# Ist Live-TV eingeschaltet, schreibt der Dienst ausserdem das XMLTV-Programm
+# fuer PVR IPTV Simple Client fort.
+import time
+from collections import deque
+import xbmc
+import addon
+
+# Takt der Hauptschleife in Sekunden (Abarbeiten gemerkter Wiedergaben)
+LOOP_INTERVAL = 1
+
+
+class SessionPlayer(xbmc.Player):
+    """Füllt nach jedem Videostart das Fenster der Wiedergabe-Session auf und
+    erkennt Videos der Session, die sich nicht abspielen lassen."""
+    
+    def __init__(self):
+        super(SessionPlayer, self).__init__()
+        self.video_id = None
+        self.started_at = 0
+        self.av_started = False
+        # Von den Callbacks gefüllt, von process_pending abgearbeitet
+        self.played = deque()
+        self.failures = deque()
+    
+    def onPlayBackStarted(self):
+        # Ein neuer Start vor dem Bild ist kein Fehler (z.B. Weiterschalten beim Puffern).
+        # Beurteilt werden nur Videos aus der Playlist der laufenden Session.
+        self.video_id = addon.get_session_video_id()
+        self.started_at = time.time()
+        self.av_started = False
+    
+    def onAVStarted(self):
+        self.av_started = True
+        video_id = addon.get_path_video_id(self.getPlayingFile())
+        if video_id:
+            self.played.append(video_id)
+        addon.feed_play_queue()
+    
+    def onPlayBackError(self):
+        self.failed(skip=True)
+    
+    def onPlayBackEnded(self):
+        # Kodi wechselt selbst zum nächsten Video
+        if not self.av_started or time.time() - self.started_at < addon.PLAYBACK_FAILURE_SECONDS:
+            self.failed(skip=False)
+        self.video_id = None
+    
+    def onPlayBackStopped(self):
+        # Vom Benutzer beendet
+        self.video_id = None
+    
+    def failed(self, skip):
+        video_id = self.video_id
+        self.video_id = None
+        if not video_id:
+            return
+        if skip:
+            playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+            position = playlist.getposition()
+            if 0 <= position < playlist.size() - 1:
+                self.play(playlist, startpos=position + 1)
+        self.failures.append(video_id)
+    
+    def process_pending(self):
+        """Trägt gespielte Videos ein und prüft fehlgeschlagene (in der Hauptschleife)."""
+        while self.played:
+            addon.record_played(self.played.popleft())
+        while self.failures:
+            addon.mark_playback_failure(self.failures.popleft())
+
+if __name__ == '__main__':
+    addon.log('Service started')
+    monitor = xbmc.Monitor()
+    player = SessionPlayer()
+    next_check = time.time() + addon.RECHECK_INTERVAL
+    while not monitor.waitForAbort(LOOP_INTERVAL):
+        player.process_pending()
+        if time.time() < next_check:
+            continue
+        next_check = time.time() + addon.RECHECK_INTERVAL
+        # Nicht während der Wiedergabe, damit das Video die Bandbreite hat
+        if not player.isPlaying():
+            addon.run_availability_check(monitor.abortRequested)
+            if addon.get_setting_bool('pvr_enabled'):
+                addon.update_live_tv()
+    addon.log('Service stopped')
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Test-Umgebung
+#
+# Ersetzt die Kodi-Module (xbmc, xbmcgui, ...) durch einfache Attrappen,
+# damit addon.py und resources.lib ausserhalb von Kodi importiert werden
+# koennen. Settings stehen in SETTINGS, das Profil in PROFILE.
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SETTINGS = {}
+PROFILE = {'path': ''}
+
+
+class _Stub(object):
+    """Nimmt beliebige Aufrufe an und tut nichts."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class Addon(object):
+
+    def __init__(self, addon_id=None):
+        pass
+
+    def getAddonInfo(self, key):
+        return {'name': 'MTV Rewind', 'id': 'plugin.video.mtvrewind', 'version': 'test',
+                'path': ROOT, 'profile': PROFILE['path']}[key]
+
+    def getSetting(self, key):
+        return str(SETTINGS.get(key, ''))
+
+    def getSettingBool(self, key):
+        return bool(SETTINGS.get(key, False))
+
+    def getSettingInt(self, key):
+        return int(SETTINGS.get(key, 0))
+
+    def getLocalizedString(self, string_id):
+        return str(string_id)
+
+
+class ListItem(object):
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.properties = {}
+
+    def setInfo(self, info_type, info):
+        self.info = info
+
+    def setArt(self, art):
+        self.art = art
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def setPath(self, path):
+        self.path = path
+
+
+class Window(object):
+    properties = {}
+
+    def __init__(self, window_id=10000):
+        pass
+
+    def getProperty(self, key):
+        return Window.properties.get(key, '')
+
+    def setProperty(self, key, value):
+        Window.properties[key] = value
+
+    def clearProperty(self, key):
+        Window.properties.pop(key, None)
+
+
+class Monitor(object):
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        return False
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def _delete(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+_module('xbmc', LOGDEBUG=0, LOGINFO=1, LOGWARNING=2, LOGERROR=3, PLAYLIST_VIDEO=1,
+        log=lambda msg, level=1: None, Monitor=Monitor, Player=_Stub, PlayList=_Stub,
+        executebuiltin=lambda command, wait=False: None, getInfoLabel=lambda label: '',
+        sleep=lambda ms: None)
+_module('xbmcaddon', Addon=Addon)
+_module('xbmcgui', ListItem=ListItem, Window=Window, Dialog=_Stub, DialogProgressBG=_Stub,
+        NOTIFICATION_INFO='info', NOTIFICATION_WARNING='warning')
+_module('xbmcplugin', SORT_METHOD_NONE=0, SORT_METHOD_LABEL=1, SORT_METHOD_ARTIST=2,
+        addDirectoryItem=lambda *args, **kwargs: True, addDirectoryItems=lambda *args, **kwargs: True,
+        addSortMethod=lambda *args, **kwargs: None, endOfDirectory=lambda *args, **kwargs: None,
+        setResolvedUrl=lambda *args, **kwargs: None, setContent=lambda *args, **kwargs: None)
+_module('xbmcvfs', translatePath=lambda path: path, exists=os.path.exists, delete=_delete,
+        mkdirs=lambda path: os.makedirs(path, exist_ok=True) or True)
+
+
+@pytest.fixture
+def load_addon(tmp_path):
+    """Importiert addon.py neu mit leerem Profil unter tmp_path und den uebergebenen Settings."""
+    def load(**settings):
+        SETTINGS.clear()
+        SETTINGS.update(settings)
+        PROFILE['path'] = str(tmp_path / 'profile') + os.sep
+        # runtime haelt Caches ueber Aufrufe hinweg; fuer jeden Test frisch laden
+        for name in ('addon', 'resources.lib.runtime'):
+            sys.modules.pop(name, None)
+        return importlib.import_module('addon')
+    yield load
+    SETTINGS.clear()
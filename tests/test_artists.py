@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Kuenstler als Index in die Tabelle des Caches
+
+from resources.lib.metadata import VideoInfo
+from resources.lib.metadata_store import BoundedCache, ShardedCache
+
+VIDEOS = [('Aaaaaaaaaa1', 'Nirvana'), ('Baaaaaaaaa1', 'Madonna'), ('Caaaaaaaaa1', 'Nirvana'),
+          ('Aaaaaaaaaa2', 'Madonna'), ('Daaaaaaaaa1', 'Nirvana')]
+
+
+def write_cache(folder):
+    cache = ShardedCache(folder)
+    for video_id, artist in VIDEOS:
+        cache[video_id] = VideoInfo(video_id, artist, 'Song', artist + ' - Song')
+    cache.save()
+
+
+def check_groups(cache):
+    video_ids = [video_id for video_id, _ in VIDEOS] + ['Eaaaaaaaaa1']
+    groups = cache.group_by_artist(video_ids)
+
+    assert all(isinstance(artist_id, int) for artist_id in groups)
+    assert dict((cache.artist_name(artist_id), ids) for artist_id, ids in groups.items()) == {
+        'Nirvana': ['Aaaaaaaaaa1', 'Caaaaaaaaa1', 'Daaaaaaaaa1'],
+        'Madonna': ['Baaaaaaaaa1', 'Aaaaaaaaaa2'],
+    }
+    return groups
+
+
+def test_sharded_cache_groups_by_artist_id(tmp_path):
+    folder = str(tmp_path / 'metadata')
+    write_cache(folder)
+    cache = ShardedCache(folder)
+
+    groups = check_groups(cache)
+    assert cache.artist_id('Caaaaaaaaa1') == cache.artist_id('Aaaaaaaaaa1')
+    assert cache.artist_id('Caaaaaaaaa1') in groups
+    assert cache.artist_id('Eaaaaaaaaa1') is None
+    # Gleiche Namen liegen nur einmal im Speicher
+    assert cache.get('Aaaaaaaaaa1').artist is cache.get('Daaaaaaaaa1').artist
+
+
+def test_bounded_cache_groups_by_artist_id(tmp_path):
+    folder = str(tmp_path / 'metadata')
+    write_cache(folder)
+    cache = BoundedCache(folder, max_entries=2)
+
+    check_groups(cache)
+    assert not cache.entries
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Ladezeit beim Oeffnen kleiner Kanaele: Shards gegen eine Datei
+#
+# Vergleicht fuer 1stday und commercials das Laden ueber die Shards, die der
+# Kanal trifft, mit dem Laden aller Shards und mit dem frueheren Laden einer
+# einzigen Cache-Datei. Die Zeiten stehen mit "pytest -s" in der Ausgabe;
+# geprueft wird nur, wie viel geladen wird (Zeiten schwanken je nach Geraet).
+
+import json
+import time
+
+import pytest
+
+from resources.lib import catalog
+from resources.lib.metadata import VideoInfo, decode_cache, encode_cache
+from resources.lib.metadata_store import SHARD_COUNT, ShardedCache, shard_of
+
+CHANNELS = ('1stday', 'commercials')
+RUNS = 5
+
+
+@pytest.fixture(scope='module')
+def full_cache(tmp_path_factory):
+    """Cache mit einem Eintrag pro Katalog-Video, als Shards und als eine Datei."""
+    folder = tmp_path_factory.mktemp('cache')
+    video_ids = set()
+    for _, channel_ids in catalog.iter_channels():
+        video_ids.update(channel_ids)
+    cache = ShardedCache(str(folder / 'metadata'))
+    for index, video_id in enumerate(sorted(video_ids)):
+        cache[video_id] = VideoInfo(video_id, 'Artist {}'.format(index % 3000), 'Song {}'.format(index),
+                                    'Artist {} - Song {} (Official Video)'.format(index % 3000, index))
+    cache.save()
+    # Frueheres Format: alle Eintraege in einer Datei
+    entries = {}
+    for shard_entries in cache.shards.values():
+        entries.update(shard_entries)
+    whole_file = str(folder / 'video_info_cache.json')
+    with open(whole_file, 'w', encoding='utf-8') as f:
+        json.dump(encode_cache(entries), f, ensure_ascii=False, separators=(',', ':'))
+    return str(folder / 'metadata'), whole_file, len(video_ids)
+
+
+def best_time(load):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = load()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, result
+
+
+@pytest.mark.parametrize('channel_id', CHANNELS)
+def test_browse_loads_only_hit_shards(full_cache, channel_id):
+    folder, whole_file, total = full_cache
+    video_ids = catalog.read_channel(channel_id)
+
+    def load_whole_file():
+        with open(whole_file, 'r', encoding='utf-8') as f:
+            entries = decode_cache(json.load(f))
+        return [entries.get(video_id) for video_id in video_ids], len(entries)
+
+    def load_sharded(video_ids_to_preload):
+        def load():
+            cache = ShardedCache(folder)
+            cache.preload(video_ids_to_preload)
+            return [cache.get(video_id) for video_id in video_ids], len(cache)
+        return load
+
+    whole_ms, (whole_rows, whole_loaded) = best_time(load_whole_file)
+    all_ms, (all_rows, all_loaded) = best_time(load_sharded(None))
+    lazy_ms, (lazy_rows, lazy_loaded) = best_time(load_sharded(video_ids))
+
+    shards = len(set(shard_of(video_id) for video_id in video_ids))
+    print('\n{}: {} videos, {}/{} shards | whole file {:.1f} ms ({} entries) | '
+          'all shards {:.1f} ms ({}) | hit shards {:.1f} ms ({})'.format(
+              channel_id, len(video_ids), shards, SHARD_COUNT, whole_ms, whole_loaded,
+              all_ms, all_loaded, lazy_ms, lazy_loaded))
+
+    assert all(info is not None for info in lazy_rows)
+    assert [info.title for info in lazy_rows] == [info.title for info in whole_rows] == \
+        [info.title for info in all_rows]
+    assert whole_loaded == all_loaded == total
+    assert lazy_loaded < total
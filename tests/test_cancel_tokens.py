@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Navigation bricht nur das Laden ab, keine langen Auftraege
+
+from resources.lib import catalog
+
+
+def test_navigation_does_not_cancel_jobs(load_addon):
+    addon = load_addon()
+    browse = addon.make_cancel_check(addon.claim_request_token())
+    export = addon.make_cancel_check(addon.claim_request_token(addon.JOB_LIBRARY), addon.JOB_LIBRARY)
+    enrich = addon.make_cancel_check(addon.claim_request_token(addon.JOB_DURATIONS), addon.JOB_DURATIONS)
+
+    # Naechster Aufruf (z.B. Zurueck oder ein anderer Kanal)
+    addon.claim_request_token()
+    assert browse()
+    assert not export() and not enrich()
+
+    # Ein neuer Export ersetzt den laufenden
+    addon.claim_request_token(addon.JOB_LIBRARY)
+    assert export()
+    assert not enrich()
+
+
+def test_library_ids_skip_dead_videos(load_addon):
+    addon = load_addon()
+    channel_id, video_ids = next(catalog.iter_channels())
+    before = sum(len(ids) for _, ids in addon.iter_library_ids())
+    dead_id = video_ids[0]
+    assert addon.update_dead_bitmaps({dead_id: addon.availability.STATUS_REMOVED})
+
+    library_ids = [video_id for _, ids in addon.iter_library_ids() for video_id in ids]
+    assert dead_id not in library_ids
+    assert len(library_ids) == before - 1 == len(set(library_ids))
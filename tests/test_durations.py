@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Videolaengen: Batches, Fortsetzen, "nicht verfuegbar"
+
+import json
+
+from resources.lib import durations
+from resources.lib.durations import DurationStore, JsonFileSource
+
+VIDEO_IDS = ['v{:09d}A'.format(index) for index in range(7)]
+# Das letzte Video kennt die Quelle nicht
+KNOWN = dict((video_id, 100 + index) for index, video_id in enumerate(VIDEO_IDS[:-1]))
+
+
+class RecordingSource(JsonFileSource):
+    batch_size = 3
+
+    def __init__(self, path):
+        JsonFileSource.__init__(self, path)
+        self.batches = []
+
+    def fetch(self, video_ids):
+        self.batches.append(list(video_ids))
+        return JsonFileSource.fetch(self, video_ids)
+
+
+def make_source(tmp_path):
+    path = tmp_path / 'durations.json'
+    path.write_text(json.dumps(KNOWN))
+    return RecordingSource(str(path))
+
+
+def test_enrich_batches_and_marks_unavailable(tmp_path):
+    source = make_source(tmp_path)
+    store = DurationStore(str(tmp_path / 'durations.bin'))
+
+    stored, cancelled = durations.enrich(source, store, VIDEO_IDS, rate=0)
+
+    assert (stored, cancelled) == (len(VIDEO_IDS), False)
+    assert all(len(batch) <= source.batch_size for batch in source.batches)
+    assert sorted(video_id for batch in source.batches for video_id in batch) == sorted(VIDEO_IDS)
+    # 0 = bei der Quelle nicht verfuegbar: gespeichert, aber ohne Dauer
+    reopened = DurationStore(store.path)
+    assert reopened.get(VIDEO_IDS[-1]) is None
+    assert VIDEO_IDS[-1] not in reopened
+    assert reopened.missing_ids(VIDEO_IDS) == []
+    assert reopened.get(VIDEO_IDS[0]) == 100
+
+    # Nicht verfuegbare Videos werden nicht erneut angefragt
+    source.batches = []
+    assert durations.enrich(source, reopened, VIDEO_IDS, rate=0) == (0, False)
+    assert source.batches == []
+
+
+def test_enrich_resumes_after_cancel(tmp_path):
+    source = make_source(tmp_path)
+    store = DurationStore(str(tmp_path / 'durations.bin'))
+    progress = []
+
+    stored, cancelled = durations.enrich(source, store, VIDEO_IDS, on_batch=lambda done, total: progress.append(done),
+                                         workers=1, rate=0, is_cancelled=lambda: bool(progress))
+    assert cancelled
+    assert 0 < stored < len(VIDEO_IDS)
+
+    resumed = DurationStore(store.path)
+    pending = resumed.missing_ids(VIDEO_IDS)
+    assert len(pending) == len(VIDEO_IDS) - stored
+    source.batches = []
+    stored_again, cancelled = durations.enrich(source, resumed, VIDEO_IDS, rate=0)
+
+    assert (stored_again, cancelled) == (len(pending), False)
+    # Nur was der abgebrochene Lauf nicht gespeichert hat, wird erneut geholt
+    assert sorted(video_id for batch in source.batches for video_id in batch) == sorted(pending)
+    assert resumed.missing_ids(VIDEO_IDS) == []
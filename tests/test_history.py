@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - No-Repeat-Fenster mit Song-Gruppen
+
+from resources.lib.history import RecentHistory
+from resources.lib.metadata_index import id_key
+
+
+def test_eviction_uses_group_from_add_time():
+    groups = {}
+    history = RecentHistory(2, group_of=groups.get)
+
+    history.add('Aaaaaaaaaa0')
+    # Song-ID wird erst nach dem Eintragen zugeordnet
+    groups[id_key('Aaaaaaaaaa0')] = 7
+    history.add('AaaaaaaaaaA')
+    history.add('Aaaaaaaaaa8')
+
+    assert history.group_counts == {}
+    assert 'Aaaaaaaaaa0' not in history
+    assert 'Aaaaaaaaaa8' in history
+
+
+def test_group_counts_follow_ring():
+    groups = {id_key('Aaaaaaaaaa0'): 1, id_key('AaaaaaaaaaA'): 1}
+    history = RecentHistory(2, group_of=groups.get)
+
+    history.add('Aaaaaaaaaa0')
+    history.add('AaaaaaaaaaA')
+    assert history.group_counts == {1: 2}
+    history.add('Aaaaaaaaaa8')
+    history.add('Aaaaaaaaaag')
+    assert history.group_counts == {}
+    assert history.keys() == [id_key('Aaaaaaaaaa8'), id_key('Aaaaaaaaaag')]
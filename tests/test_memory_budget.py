@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Speicherspar-Modus haelt sein Budget beim Oeffnen eines Kanals ein
+
+import tracemalloc
+
+from resources.lib import catalog
+from resources.lib.metadata import VideoInfo
+from resources.lib.metadata_store import ShardedCache
+
+CHANNEL = '2020s'
+
+
+def write_cache(folder, video_ids):
+    cache = ShardedCache(folder)
+    for index, video_id in enumerate(video_ids):
+        cache[video_id] = VideoInfo(video_id, 'Artist {}'.format(index % 3000), 'Song Title {}'.format(video_id),
+                                    'Artist - Song Title (Official Video) {}'.format(video_id))
+    cache.save()
+
+
+def test_browse_channel_peak_below_budget(load_addon, monkeypatch):
+    budget_mb = 2
+    addon = load_addon(memory_budget=budget_mb, fetch_metadata=True)
+    video_ids = catalog.read_channel(CHANNEL)
+    write_cache(addon.CACHE_FOLDER, video_ids)
+
+    # Kodi uebernimmt die ListItems; im Prozess bleibt nur ihre Anzahl
+    added = []
+    monkeypatch.setattr(addon.xbmcplugin, 'addDirectoryItems',
+                        lambda handle, items, total=0: added.append(len(items)) or True)
+    addon.REQUEST = addon.runtime.RequestContext(
+        ['plugin://plugin.video.mtvrewind/', '1', '?action=browse&channel=' + CHANNEL],
+        addon.claim_request_token())
+    # Das Manifest wird einmal pro Prozess geladen und zaehlt nicht zum Aufruf
+    addon.get_manifest()
+
+    tracemalloc.start()
+    try:
+        addon.browse_channel(1, CHANNEL)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert sum(added) == len(video_ids) + 4
+    assert len(added) > 2
+    assert peak < budget_mb * 1024 * 1024
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Dienst und Plugin schreiben denselben Cache
+
+from resources.lib.metadata import VideoInfo, STATUS_OK, STATUS_REMOVED
+from resources.lib.metadata_store import ShardedCache, shard_of
+
+FIRST_ID = 'Aaaaaaaaaa1'
+SECOND_ID = 'Aaaaaaaaaa2'
+
+
+def test_save_keeps_entries_written_by_another_process(tmp_path):
+    folder = str(tmp_path / 'metadata')
+    seed = ShardedCache(folder)
+    seed[FIRST_ID] = VideoInfo(FIRST_ID, 'Artist', 'One', 'Artist - One')
+    seed[SECOND_ID] = VideoInfo(SECOND_ID, 'Artist', 'Two', 'Artist - Two')
+    seed.save()
+    assert shard_of(FIRST_ID) == shard_of(SECOND_ID)
+
+    service = ShardedCache(folder)
+    plugin = ShardedCache(folder)
+    service.get(FIRST_ID)
+    plugin.get(FIRST_ID)
+
+    service[FIRST_ID] = VideoInfo(FIRST_ID, '', '', '', STATUS_REMOVED)
+    service.save()
+    plugin[SECOND_ID] = VideoInfo(SECOND_ID, 'Artist', 'Two (Live)', 'Artist - Two (Live)')
+    plugin.save()
+
+    reader = ShardedCache(folder)
+    assert reader.get(FIRST_ID).status == STATUS_REMOVED
+    assert reader.get(SECOND_ID).title == 'Two (Live)'
+    assert plugin.get(FIRST_ID).status == STATUS_REMOVED
+    assert reader.get(SECOND_ID).status == STATUS_OK
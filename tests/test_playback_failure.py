@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Fehlgeschlagene Wiedergabe nimmt ein Video sofort aus der Rotation
+
+from resources.lib import catalog, recheck
+from resources.lib.metadata import VideoInfo, STATUS_OK, STATUS_REMOVED, STATUS_UNPLAYABLE
+
+CHANNEL = '2020s'
+
+
+def test_first_failure_marks_unplayable(load_addon, monkeypatch):
+    addon = load_addon(fetch_metadata=True)
+    video_ids = catalog.read_channel(CHANNEL)
+    video_id = video_ids[3]
+    monkeypatch.setattr(addon, 'fetch_video_info',
+                        lambda vid: VideoInfo(vid, 'Artist', 'Song', 'Artist - Song', STATUS_OK))
+
+    addon.mark_playback_failure(video_id)
+
+    assert addon.VIDEO_INFO_CACHE.get(video_id).status == STATUS_UNPLAYABLE
+    assert addon.VIDEO_INFO_CACHE.get(video_id).title == 'Song'
+    assert addon.load_dead_bitmap(CHANNEL, len(video_ids)).filter(video_ids) == \
+        [vid for vid in video_ids if vid != video_id]
+    # Nur die Existenz bestaetigt: keine Pruefung eingetragen, der Fehler hat Vorrang
+    assert addon.get_check_store().get(video_id, 0) == 0
+    assert recheck.select_candidates([video_ids[0], video_id], addon.get_check_store(), addon.get_failure_store(),
+                                     set(), 1, addon.get_failure_store().get(video_id)) == [video_id]
+
+
+def test_removed_video_counts_as_checked(load_addon, monkeypatch):
+    addon = load_addon(fetch_metadata=True)
+    video_id = catalog.read_channel(CHANNEL)[3]
+    monkeypatch.setattr(addon, 'fetch_video_info',
+                        lambda vid: VideoInfo(vid, '', '', '', STATUS_REMOVED))
+
+    addon.mark_playback_failure(video_id)
+
+    assert addon.VIDEO_INFO_CACHE.get(video_id).status == STATUS_REMOVED
+    assert addon.get_check_store().get(video_id, 0) > 0
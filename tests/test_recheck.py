@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Auswahl und Tagesbudget der Verfuegbarkeits-Pruefung
+
+import datetime
+import random
+
+from resources.lib import recheck
+from resources.lib.metadata_index import id_key
+from resources.lib.recheck import DAY, DailyBudget, TimestampStore
+
+NOW = int(datetime.datetime(2026, 10, 19, 12, 0).timestamp())
+
+
+def ids(prefix, count):
+    return ['{}{:09d}A'.format(prefix, index) for index in range(count)]
+
+
+def stores(tmp_path, checked, failed):
+    check_store = TimestampStore(str(tmp_path / 'checked.bin'))
+    failure_store = TimestampStore(str(tmp_path / 'failures.bin'))
+    check_store.add(checked)
+    failure_store.add(failed)
+    return check_store, failure_store
+
+
+def catalog_buckets(tmp_path, size):
+    """(video_ids, stores, played_keys, {bucket: ids}) mit size IDs pro Prioritaet."""
+    failures = ids('f', size)
+    played = ids('p', size)
+    never = ids('n', size)
+    oldest = ids('o', size)
+    fresh = ids('r', size)
+    checked = {}
+    checked.update((video_id, NOW - 10 * DAY) for video_id in failures)
+    checked.update((video_id, NOW - 8 * DAY - index) for index, video_id in enumerate(played))
+    checked.update((video_id, NOW - 2 * DAY - index) for index, video_id in enumerate(oldest))
+    checked.update((video_id, NOW - 3600) for video_id in fresh)
+    failed = dict((video_id, NOW - 3600 - index) for index, video_id in enumerate(failures))
+    video_ids = fresh + oldest + never + played + failures
+    random.Random(1).shuffle(video_ids)
+    played_keys = set(id_key(video_id) for video_id in played)
+    return video_ids, stores(tmp_path, checked, failed), played_keys, (failures, played, never, oldest)
+
+
+def test_select_candidates_follows_priorities(tmp_path):
+    video_ids, (checked, failed), played_keys, (failures, played, never, oldest) = catalog_buckets(tmp_path, 3)
+
+    result = recheck.select_candidates(video_ids, checked, failed, played_keys, 100, NOW)
+
+    # Neueste Fehler zuerst, dann die am laengsten nicht gepruefte gespielten Videos,
+    # dann nie gepruefte (zufaellig), zuletzt die aeltesten Pruefungen
+    assert result[:3] == failures
+    assert result[3:6] == played[::-1]
+    assert sorted(result[6:9]) == never
+    assert result[9:] == oldest[::-1]
+
+
+def test_select_candidates_respects_limit(tmp_path):
+    video_ids, (checked, failed), played_keys, (failures, played, never, oldest) = catalog_buckets(tmp_path, 3)
+
+    assert recheck.select_candidates(video_ids, checked, failed, played_keys, 2, NOW) == failures[:2]
+    result = recheck.select_candidates(video_ids, checked, failed, played_keys, 5, NOW)
+    assert result == failures + played[::-1][:2]
+    result = recheck.select_candidates(video_ids, checked, failed, played_keys, 8, NOW)
+    assert len(result) == 8 and set(result[6:]) <= set(never)
+    assert recheck.select_candidates(video_ids, checked, failed, played_keys, 0, NOW) == []
+
+
+def test_unplayable_video_is_due_after_retry_age(tmp_path):
+    video_id = ids('u', 1)[0]
+    failed_at = NOW - recheck.UNPLAYABLE_RETRY_AGE - 60
+    checked, failed = stores(tmp_path, {video_id: failed_at + 3600}, {video_id: failed_at})
+    unplayable = TimestampStore(str(tmp_path / 'playback_failures.bin'))
+    unplayable.add({video_id: failed_at})
+    others = ids('o', 2)
+    checked.add(dict((other, failed_at - 10 * DAY) for other in others))
+
+    assert recheck.select_candidates(others + [video_id], checked, failed, set(), 1, NOW, unplayable) == [video_id]
+    # Vor Ablauf der Frist nur noch in der Gruppe der aeltesten Pruefungen
+    assert recheck.select_candidates(others + [video_id], checked, failed, set(), 1,
+                                     failed_at + DAY * 2, unplayable) != [video_id]
+    # Nach der erneuten Pruefung nicht mehr faellig
+    checked.add({video_id: NOW})
+    assert recheck.select_candidates([video_id], checked, failed, set(), 1, NOW + 3600, unplayable) == []
+
+
+def test_daily_budget_is_never_exceeded(tmp_path):
+    path = str(tmp_path / 'recheck.json')
+    interval = 6 * 3600
+    per_day = 100
+    spent = {}
+    now = int(datetime.datetime(2026, 10, 19, 1, 30).timestamp())
+    for run in range(12):
+        # Jeder Lauf liest das Budget neu, wie der Dienst
+        budget = DailyBudget(path, per_day)
+        allowance = budget.allowance(now, interval)
+        budget.spend(allowance)
+        day = budget.day
+        spent[day] = spent.get(day, 0) + allowance
+        assert spent[day] <= per_day
+        now += interval
+    # Das Budget wird auch ausgeschoepft, jeder neue Tag beginnt von vorn
+    assert len(spent) == 3
+    assert all(total == per_day for total in list(spent.values())[:-1])
+
+
+def test_age_histogram_buckets():
+    checked = {'a': NOW - 3600, 'b': NOW - 3 * DAY, 'c': NOW - 10 * DAY, 'd': NOW - 60 * DAY,
+               'e': NOW - 200 * DAY, 'f': NOW - DAY}
+    histogram = recheck.age_histogram(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h'], checked, NOW)
+
+    assert histogram == [('nie', 2), ('< 1 Tag', 1), ('< 1 Woche', 2), ('< 1 Monat', 1), ('< 3 Monate', 1),
+                         ('älter', 1)]
+    assert recheck.format_histogram(histogram).startswith('nie: 2 (25%), < 1 Tag: 1 (12%)')
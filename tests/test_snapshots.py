@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# MTV Rewind - Snapshots verfallen nur durch Aenderungen am eigenen Kanal
+
+from resources.lib import snapshots
+from resources.lib.metadata import VideoInfo
+from resources.lib.metadata_store import ShardedCache, shard_of
+
+CHANNEL_IDS = ['Aaaaaaaaaa1', 'Aaaaaaaaaa2', 'Baaaaaaaaa1']
+OTHER_ID = 'Aaaaaaaaaa9'
+
+
+def store(cache, video_id, title):
+    cache[video_id] = VideoInfo(video_id, 'Artist', title, 'Artist - ' + title)
+    cache.save()
+
+
+def load(folder, cache):
+    return snapshots.load_snapshot(folder, 'test', snapshots.snapshot_key(CHANNEL_IDS, 'metadata'),
+                                   CHANNEL_IDS, cache.changed_since)
+
+
+def test_snapshot_survives_changes_to_other_channels(tmp_path):
+    cache = ShardedCache(str(tmp_path / 'metadata'))
+    for video_id in CHANNEL_IDS:
+        store(cache, video_id, 'Song')
+    folder = str(tmp_path / 'snapshots')
+    since = cache.change_position()
+    snapshots.save_snapshot(folder, 'test', snapshots.snapshot_key(CHANNEL_IDS, 'metadata'), [['row']], since)
+    assert load(folder, cache) == [('row',)]
+
+    # Gleicher Shard, aber ein anderer Kanal
+    assert shard_of(OTHER_ID) == shard_of(CHANNEL_IDS[0])
+    store(cache, OTHER_ID, 'Other')
+    assert load(folder, cache) == [('row',)]
+
+    store(cache, CHANNEL_IDS[1], 'Changed')
+    assert load(folder, cache) is None
+
+
+def test_snapshot_is_stale_after_log_restart(tmp_path, monkeypatch):
+    cache = ShardedCache(str(tmp_path / 'metadata'))
+    store(cache, OTHER_ID, 'Other')
+    folder = str(tmp_path / 'snapshots')
+    snapshots.save_snapshot(folder, 'test', snapshots.snapshot_key(CHANNEL_IDS, 'metadata'), [['row']],
+                            cache.change_position())
+
+    monkeypatch.setattr('resources.lib.metadata_store.CHANGES_MAX_BYTES', 0)
+    store(cache, OTHER_ID, 'Again')
+    assert load(folder, cache) is None